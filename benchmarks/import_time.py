@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Import-time budget for the CLI.
+
+Short CLI runs are dominated by imports, so importing socho.cli must stay
+under a time budget and must not pull in pandas or the rules themselves
+(socho.profile is only imported once a rule runs).
+
+Usage:
+    python benchmarks/import_time.py [--budget MS] [--runs N]
+
+Exits with status 1 when the budget is exceeded.
+"""
+import re
+import sys
+import argparse
+import subprocess
+
+# Default budget for `import socho.cli`, in milliseconds
+BUDGET_MS = 200
+
+# Modules socho.cli must not import at load time
+FORBIDDEN = ['pandas', 'socho.profile']
+
+CHECK = "import sys, socho.cli; print(','.join(m for m in {} if m in sys.modules))"
+
+
+def import_time(module):
+    """Return the cumulative import time of a module in ms (fresh process)."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+                            capture_output=True, text=True, check=True)
+
+    # Lines look like: "import time:   self [us] | cumulative | imported package"
+    for line in result.stderr.splitlines():
+        match = re.match(r'import time:\s+\d+ \|\s+(\d+) \| (\S+)$', line)
+
+        if match and match.group(2) == module:
+            return int(match.group(1)) / 1000
+
+    raise RuntimeError("no import time found for {}".format(module))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--budget",
+                        dest="budget",
+                        type=float,
+                        default=BUDGET_MS,
+                        help="Import time budget, in ms.")
+
+    parser.add_argument("--runs",
+                        dest="runs",
+                        type=int,
+                        default=5,
+                        help="Number of measurements (the median is used).")
+
+    args = parser.parse_args()
+
+    # Median of fresh interpreters
+    times = sorted(import_time('socho.cli') for _ in range(args.runs))
+    median = times[len(times) // 2]
+
+    print("import socho.cli: {:.1f} ms (budget {:.1f} ms)".format(median, args.budget))
+
+    # Heavy modules imported at load time
+    result = subprocess.run([sys.executable, '-c', CHECK.format(FORBIDDEN)],
+                            capture_output=True, text=True, check=True)
+    imported = result.stdout.strip()
+
+    failed = False
+
+    if imported:
+        print("socho.cli imports {} at load time".format(imported))
+        failed = True
+
+    if median > args.budget:
+        print("import time budget exceeded")
+        failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
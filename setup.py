@@ -8,7 +8,7 @@ setup(
 	packages = ['socho'],
 	version = '1.3.3',
 	description = 'Social choice functions and CLI tool',
-	install_requires = ['numpy', 'pandas'],
+	install_requires = ['numpy'],
 	long_description = long_description,
     long_description_content_type = "text/markdown",
 	author = 'Luke Harold Miles, Bernardo Trevizan',
@@ -1,31 +1,60 @@
 #!/usr/bin/env python3
-import numpy
+import sys
 import argparse
 
-from pandas import read_csv
-from socho.profile import Profile
+from socho.reader import read_scores
 
 
-def process_args(args):
-	data = read_csv(args.input_filepath, sep=args.sep)  # read the data file
-
-	mayors = data.axes[0]								# line labels (mayors)
-	mayors = list(mayors)								# cast to list
+def load_scores(filepath, sep):
+	"""Read a scores file and return (mayors labels, votes X mayors matrix)."""
+	mayors, data = read_scores(filepath, sep)  # read the data file
 
 	# (mayors X votes) to (votes X mayors)
-	data = numpy.array(data.T)  				    	# transpose
-
-	if args.function == 'plurality':
-		predictions = read_csv(args.predictions_filepath, sep=args.sep)  # get predicitons
-		predictions = numpy.array(predictions.T)						 # transpose
-		ranking = Profile.plurality(data, predictions)					 # get ranking
-	else:
-		profile = Profile.ballot_box(data)									 # create profile
-		if args.function == 'kemeny_young':
-			ranking = profile.kemeny_young()
-		else:
-			scorer = eval('profile.' + args.function) 	     			 # voting method
-			ranking = profile.ranking(scorer)							 # get ranking
+	return mayors, data.T
+
+
+# Social choice functions, name -> rule(args, data) returning a ranking.
+# socho.profile is only imported once a rule runs.
+def _scorer(name):
+	"""Rule ranking a profile with one of its score functions."""
+	def rule(args, data):
+		from socho.profile import Profile
+
+		profile = Profile.ballot_box(data)		# create profile
+		scorer = getattr(profile, name)			# voting method
+		return profile.ranking(scorer)			# get ranking
+
+	return rule
+
+
+def _plurality(args, data):
+	from socho.profile import Profile
+
+	_, predictions = load_scores(args.predictions_filepath, args.sep)  # get predictions
+	return Profile.plurality(data, predictions)						 # get ranking
+
+
+def _kemeny_young(args, data):
+	from socho.profile import Profile
+
+	return Profile.ballot_box(data).kemeny_young()
+
+
+RULES = {
+	'borda': _scorer('borda'),
+	'plurality': _plurality,
+	'simpson': _scorer('simpson'),
+	'copeland': _scorer('copeland'),
+	'dowdall': _scorer('dowdall'),
+	'kemeny_young': _kemeny_young,
+	'symmetric_borda': _scorer('symmetric_borda'),
+}
+
+
+def process_args(args):
+	mayors, data = load_scores(args.input_filepath, args.sep)  # read the data file
+
+	ranking = RULES[args.function](args, data)
 
 	# Map back to mayors labels
 	for i in range(len(ranking)):
@@ -84,6 +113,11 @@ def process_args(args):
 
 
 def main():
+	# socho serve [...] runs the long-running aggregation server
+	if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+		from socho.server import main as serve
+		return serve(sys.argv[2:])
+
 	parser = argparse.ArgumentParser()
 
 	#-input FILEPATH -f FUNCTION -o FILEPATH
@@ -105,7 +139,7 @@ def main():
 						dest="function",
 						help="Social choice function.",
 						required=True,
-						choices=['borda', 'plurality', 'simpson', 'copeland', 'dowdall', 'kemeny_young', 'symmetric_borda'])
+						choices=list(RULES))
 
 	parser.add_argument("-o", "--output",
 						dest="output_filepath",
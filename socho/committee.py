@@ -0,0 +1,136 @@
+"""Multi-winner committee rules, optimized with lazy greedy.
+
+The objectives are submodular: a mayor's marginal gain only drops as the
+committee grows. So the gains are kept in a priority queue and a popped
+gain is recomputed only when it's stale, most mayors never are. Voters'
+satisfaction is tracked per ballot in arrays, so a gain is one pass over
+the ballots.
+
+Every rule takes the ballot position matrix (see
+socho.pairwise.position_matrix) and returns the committee as column
+indexes, in selection order. Ties go to the lowest column, as in a plain
+greedy.
+"""
+import heapq
+import numpy
+
+
+def lazy_greedy(n, n_mayors, gain, select):
+    """Pick n columns greedily by marginal gain, recomputing lazily.
+
+    Keyword arguments:
+        n -- committee size
+        n_mayors -- number of columns
+        gain -- function column -> current marginal gain
+        select -- function column -> None, adds it to the committee
+    """
+    heap = [(-gain(c), c) for c in range(n_mayors)]
+    heapq.heapify(heap)
+
+    committee = list()
+
+    while heap and len(committee) < n:
+        _, c = heapq.heappop(heap)
+        fresh = (-gain(c), c)
+
+        # Stale gains are upper bounds, so beating the next one is enough
+        if not heap or fresh <= heap[0]:
+            select(c)
+            committee.append(c)
+        else:
+            heapq.heappush(heap, fresh)
+
+    return committee
+
+
+def borda_utilities(positions):
+    """Borda points of every mayor in every ballot."""
+    return positions.shape[1] - 1 - positions
+
+
+def chamberlin_courant(weights, positions, n):
+    """Chamberlin-Courant: maximize the votes' Borda points for their
+    favourite committee member.
+
+    Keyword arguments:
+        weights -- votes per ballot
+        positions -- ballot position matrix
+        n -- committee size
+    """
+    utilities = borda_utilities(positions)
+    best = numpy.zeros(len(weights), dtype=utilities.dtype)  # satisfaction per ballot
+
+    def gain(c):
+        return int(weights @ numpy.maximum(utilities[:, c] - best, 0))
+
+    def select(c):
+        numpy.maximum(best, utilities[:, c], out=best)
+
+    return lazy_greedy(n, positions.shape[1], gain, select)
+
+
+def proportional_approval(weights, positions, n, approval=None):
+    """Proportional Approval Voting over the top positions: a ballot
+    approves its first `approval` mayors and gets 1 + 1/2 + ... + 1/k for
+    k approved committee members.
+
+    Keyword arguments:
+        weights -- votes per ballot
+        positions -- ballot position matrix
+        n -- committee size
+        approval -- approved positions per ballot (default n)
+    """
+    if approval is None:
+        approval = n
+
+    approves = positions < approval
+    members = numpy.zeros(len(weights))  # approved members per ballot
+
+    def gain(c):
+        voters = approves[:, c]
+        return float(weights[voters] @ (1 / (members[voters] + 1)))
+
+    def select(c):
+        members[approves[:, c]] += 1
+
+    return lazy_greedy(n, positions.shape[1], gain, select)
+
+
+def monroe(weights, positions, n):
+    """Greedy Monroe approximation: each committee member represents
+    ceil(votes / n) votes, the unassigned ones giving him the most Borda
+    points, and the total represented points is maximized.
+
+    Keyword arguments:
+        weights -- votes per ballot
+        positions -- ballot position matrix
+        n -- committee size
+    """
+    # Empty committee, as the other rules (and no quota to divide by)
+    if n < 1:
+        return list()
+
+    utilities = borda_utilities(positions)
+    left = numpy.asarray(weights, dtype=numpy.int64).copy()  # unassigned votes per ballot
+
+    quota = -(-int(left.sum()) // n)
+
+    def represented(c):
+        """(ballots, votes) the mayor would represent, best first."""
+        order = numpy.argsort(-utilities[:, c], kind='stable')
+        order = order[left[order] > 0]
+
+        # Whole ballots while under quota, then part of the next one
+        taken = numpy.minimum(left[order], numpy.maximum(quota - (numpy.cumsum(left[order]) - left[order]), 0))
+
+        return order, taken
+
+    def gain(c):
+        order, taken = represented(c)
+        return int(taken @ utilities[order, c])
+
+    def select(c):
+        order, taken = represented(c)
+        left[order] -= taken
+
+    return lazy_greedy(n, positions.shape[1], gain, select)
@@ -0,0 +1,460 @@
+"""Array based pairwise statistics for large candidate sets.
+
+Profile keeps the net preference graph as a dict of dicts, that is m^2
+Python ints for m mayors. PairwiseStore keeps the same numbers in a
+memory-mapped (m X m) array of a small integer dtype, filled tile by tile
+from the ballot position matrix, and the pairwise rules stream over it in
+row blocks. Peak RAM is bounded by the tile and block sizes, not by m^2.
+
+For example:
+    store = PairwiseStore.build({(40,(0,1,2)),(28,(1,2,0)),(32,(2,1,0))})
+    store.ranking('copeland')   # [(1, 2), (2, 0), (0, -2)]
+"""
+import os
+import tempfile
+import numpy
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+from socho.scoring import by_score
+
+# Bytes of comparisons held at once while filling a tile
+TILE_BYTES = 2 ** 26
+
+# Bytes of the store read at once while streaming row blocks
+BLOCK_BYTES = 2 ** 26
+
+# Bytes of float32 transition blocks kept in RAM by markov_chain
+MARKOV_CACHE_BYTES = 2 ** 30
+
+
+def position_matrix(pairs, mayors):
+    """Return (weights, positions) arrays for (number of votes, ballot) pairs.
+
+    weights[u] is the number of votes of the u-th ballot and positions[u, c]
+    is the position of mayors[c] in that ballot (0 is the top).
+
+    Keyword arguments:
+        pairs -- an iterable of (number of votes, ballot)
+        mayors -- ordered list of mayors, gives the columns
+    """
+    index = {mayor: c for c, mayor in enumerate(mayors)}
+    pairs = list(pairs)
+
+    n_mayors = len(mayors)
+    weights = numpy.array([n_votes for n_votes, _ in pairs], dtype=numpy.int64)
+
+    # order[u, p] -- column of the mayor at position p of the u-th ballot
+    order = numpy.array([[index[mayor] for mayor in ballot] for _, ballot in pairs],
+                        dtype=numpy.intp).reshape(len(pairs), n_mayors)
+
+    positions = numpy.empty_like(order)
+    ranks = numpy.broadcast_to(numpy.arange(n_mayors), order.shape)
+    numpy.put_along_axis(positions, order, ranks, axis=1)
+
+    return weights, positions
+
+
+def _net_tile(weights, positions, rows, cols):
+    """Net preference of rows over cols, summed in chunks of ballots.
+
+    Keyword arguments:
+        weights -- votes per ballot
+        positions -- ballot position matrix
+        rows -- slice of row mayors
+        cols -- slice of column mayors
+    """
+    pos_rows = positions[:, rows]
+    pos_cols = positions[:, cols]
+
+    n_rows, n_cols = pos_rows.shape[1], pos_cols.shape[1]
+    tile = numpy.zeros((n_rows, n_cols), dtype=numpy.int64)
+
+    # Ballots per chunk, so the comparisons stay under TILE_BYTES: two
+    # boolean masks per (ballot, row, col), the first reused as the int8 sign
+    chunk = max(1, TILE_BYTES // (2 * max(1, n_rows * n_cols)))
+
+    for start in range(0, len(weights), chunk):
+        stop = start + chunk
+
+        # +1 where the row mayor is ahead of the column mayor, -1 behind
+        sign = (pos_rows[start:stop, :, None] < pos_cols[start:stop, None, :]).view(numpy.int8)
+        sign -= (pos_rows[start:stop, :, None] > pos_cols[start:stop, None, :]).view(numpy.int8)
+
+        tile += numpy.einsum('u,uij->ij', weights[start:stop], sign)
+
+    return tile
+
+
+def _net_tiles(weights, positions, tile):
+    """Yield (rows, cols, net) for the upper triangle tiles of the net
+    preference matrix, the lower ones being their negated transposes.
+
+    Keyword arguments:
+        weights -- votes per ballot
+        positions -- ballot position matrix
+        tile -- tile side, in mayors
+    """
+    n_mayors = positions.shape[1]
+
+    for i in range(0, n_mayors, tile):
+        rows = slice(i, min(i + tile, n_mayors))
+
+        for j in range(i, n_mayors, tile):
+            cols = slice(j, min(j + tile, n_mayors))
+            yield rows, cols, _net_tile(weights, positions, rows, cols)
+
+
+def position_counts(weights, positions):
+    """Return counts[p, c], the number of votes with mayor c at position p.
+
+    Keyword arguments:
+        weights -- votes per ballot
+        positions -- ballot position matrix
+    """
+    n_mayors = positions.shape[1]
+    counts = numpy.zeros((n_mayors, n_mayors), dtype=numpy.int64)
+
+    columns = numpy.broadcast_to(numpy.arange(n_mayors), positions.shape)
+    numpy.add.at(counts, (positions, columns), weights[:, None])
+
+    return counts
+
+
+def _shard_statistics(name, n_shards, index, pairs, mayors, tile=1024):
+    """Worker: write a shard's net preference and position counts into
+    its slot of the shared (n_shards, 2, m, m) array."""
+    n_mayors = len(mayors)
+    memory = SharedMemory(name=name)
+
+    try:
+        partials = numpy.ndarray((n_shards, 2, n_mayors, n_mayors),
+                                 dtype=numpy.int64, buffer=memory.buf)
+
+        weights, positions = position_matrix(pairs, mayors)
+
+        # Tile by tile, so a worker's comparisons stay under TILE_BYTES
+        for rows, cols, net in _net_tiles(weights, positions, tile):
+            partials[index, 0, rows, cols] = net
+            partials[index, 0, cols, rows] = -net.T
+
+        partials[index, 1] = position_counts(weights, positions)
+
+        del partials  # release the buffer before closing
+    finally:
+        memory.close()
+
+
+def parallel_statistics(pairs, mayors, n_jobs):
+    """Return (net, counts) for (number of votes, ballot) pairs, sharding
+    the ballots across a process pool and summing the partial matrices.
+
+    net[i, j] is the net preference of mayors[i] over mayors[j] and
+    counts[p, c] the number of votes with mayors[c] at position p. Both are
+    integer sums, so they don't depend on how the ballots are sharded.
+
+    Keyword arguments:
+        pairs -- an iterable of (number of votes, ballot)
+        mayors -- ordered list of mayors
+        n_jobs -- number of worker processes
+    """
+    pairs = list(pairs)
+    n_mayors = len(mayors)
+
+    # Contiguous shards, at most one per job
+    n_shards = max(1, min(n_jobs, len(pairs)))
+    size = -(-len(pairs) // n_shards)
+    shards = [pairs[i:i + size] for i in range(0, len(pairs), size)]
+    n_shards = len(shards)
+
+    nbytes = n_shards * 2 * n_mayors * n_mayors * numpy.dtype(numpy.int64).itemsize
+    memory = SharedMemory(create=True, size=max(1, nbytes))
+
+    try:
+        with ProcessPoolExecutor(max_workers=n_shards) as pool:
+            jobs = [pool.submit(_shard_statistics, memory.name, n_shards, i, shard, mayors)
+                    for i, shard in enumerate(shards)]
+
+            for job in jobs:
+                job.result()  # raise workers' errors
+
+        partials = numpy.ndarray((n_shards, 2, n_mayors, n_mayors),
+                                 dtype=numpy.int64, buffer=memory.buf)
+
+        # Reduce
+        net, counts = partials.sum(axis=0)
+        del partials
+    finally:
+        memory.close()
+        memory.unlink()
+
+    return net, counts
+
+
+def markov_chain(flow, stay, alpha=0.15, tol=1e-8, max_iter=1000):
+    """Return (stationary distribution, iterations) of a MC4 chain, found
+    by power iteration.
+
+    From mayor i, the chain picks a mayor j uniformly and moves there if
+    the majority prefers j over i (or, weighted, with probability margin /
+    top margin), otherwise it stays. With probability alpha it jumps to a
+    random mayor instead, so there is a single stationary distribution.
+
+    Keyword arguments:
+        flow -- function x -> probability flowing into each mayor, i.e. a
+            sparse (transition matrix)^T @ x without the diagonal
+        stay -- probability of staying at each mayor
+        alpha -- jump probability (default 0.15)
+        tol -- stop when the L1 change is below tol (default 1e-8)
+        max_iter -- iteration cap (default 1000)
+    """
+    n_mayors = len(stay)
+    x = numpy.full(n_mayors, 1.0 / n_mayors)
+    iteration = 0
+
+    for iteration in range(1, max_iter + 1):
+        new_x = (1 - alpha) * (flow(x) + stay * x) + alpha / n_mayors
+
+        new_x /= new_x.sum()
+        change = numpy.abs(new_x - x).sum()
+        x = new_x
+
+        if change < tol:
+            break
+
+    return x, iteration
+
+
+class PairwiseStore():
+    """Disk-backed net preference matrix.
+
+    net[i, j] is the number of votes preferring mayors[i] over mayors[j]
+    minus the votes preferring mayors[j] over mayors[i], as in
+    Profile.net_preference_graph.
+
+    Properties:
+        mayors -- ordered list of mayors
+        index -- mayor -> row/column
+        net -- numpy.memmap (m X m)
+        path -- file backing the matrix
+    """
+
+    def __init__(self, mayors, path=None, dtype=numpy.int64, mode='w+'):
+        """Map (or create) the matrix file.
+
+        Keyword arguments:
+            mayors -- ordered list of mayors
+            path -- file to map, a temporary file if None (default None)
+            dtype -- integer dtype of the counts (default numpy.int64)
+            mode -- numpy.memmap mode (default 'w+')
+        """
+        self.mayors = list(mayors)
+        self.index = {mayor: i for i, mayor in enumerate(self.mayors)}
+
+        # Temporary files are removed on close
+        self._temporary = path is None
+
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix='socho-', suffix='.pairwise')
+            os.close(fd)
+
+        self.path = path
+
+        n_mayors = len(self.mayors)
+        self.net = numpy.memmap(path, dtype=dtype, mode=mode, shape=(n_mayors, n_mayors))
+
+    @classmethod
+    def build(cls, pairs, mayors=None, path=None, tile=1024):
+        """Fill a store tile by tile from (number of votes, ballot) pairs.
+
+        Keyword arguments:
+            pairs -- an iterable of (number of votes, ballot)
+            mayors -- ordered list of mayors (default sorted mayors)
+            path -- file to map, a temporary file if None (default None)
+            tile -- tile side, in mayors (default 1024)
+        """
+        pairs = list(pairs)
+
+        if mayors is None:
+            mayors = sorted(pairs[0][1])
+
+        weights, positions = position_matrix(pairs, mayors)
+
+        # Smallest signed dtype holding +-total votes. Asked for -total - 1,
+        # as the type of -total may miss +total (int8 for 128 votes)
+        total_votes = int(weights.sum())
+        dtype = numpy.promote_types(numpy.min_scalar_type(-total_votes - 1), numpy.int8)
+
+        store = cls(mayors, path, dtype)
+
+        # Upper triangle tiles, the lower ones are their negated transposes
+        for rows, cols, net in _net_tiles(weights, positions, tile):
+            store.net[rows, cols] = net
+            store.net[cols, rows] = -net.T
+
+        store.net.flush()
+        return store
+
+    def net_preference(self, mayor1, mayor2):
+        """Return the net preference of mayor1 over mayor2.
+
+        Keyword arguments:
+            mayor1 -- mayor to be compared
+            mayor2 -- other mayor to be compared
+        """
+        return int(self.net[self.index[mayor1], self.index[mayor2]])
+
+    def blocks(self, block=None, copy=True):
+        """Yield (first row, rows array) blocks of the matrix.
+
+        Keyword arguments:
+            block -- rows per block (default fits BLOCK_BYTES)
+            copy -- int64 copies, instead of read-only views of the
+                stored dtype (default True)
+        """
+        n_mayors = len(self.mayors)
+
+        # Bytes per element of what is yielded
+        itemsize = numpy.dtype(numpy.int64).itemsize if copy else self.net.itemsize
+
+        if block is None:
+            block = max(1, BLOCK_BYTES // max(1, n_mayors * itemsize))
+
+        for start in range(0, n_mayors, block):
+            if copy:
+                yield start, numpy.array(self.net[start:start + block], dtype=numpy.int64)
+            else:
+                yield start, self.net[start:start + block]
+
+    # Row block scores, aligned with self.mayors. They work on views of the
+    # stored dtype, so temporaries are no bigger than the blocks, and only
+    # the sums are int64
+    def copeland(self):
+        """Return the Copeland scores."""
+        return numpy.concatenate([numpy.sign(rows).sum(axis=1, dtype=numpy.int64)
+                                  for _, rows in self.blocks(copy=False)])
+
+    def symmetric_borda(self):
+        """Return the Symmetric Borda scores."""
+        return numpy.concatenate([rows.sum(axis=1, dtype=numpy.int64)
+                                  for _, rows in self.blocks(copy=False)])
+
+    def simpson(self):
+        """Return the Simpson scores (worst pairwise margin)."""
+        scores = list()
+
+        for start, rows in self.blocks(copy=False):
+            rows = numpy.array(rows)  # writable, still the stored dtype
+
+            # A mayor is not compared with himself
+            diagonal = numpy.arange(len(rows))
+            rows[diagonal, start + diagonal] = numpy.iinfo(rows.dtype).max
+
+            scores.append(rows.min(axis=1).astype(numpy.int64))
+
+        return numpy.concatenate(scores)
+
+    def condorcet_winners(self):
+        """Return the set of (weak) Condorcet winners."""
+        winners = set()
+
+        for start, rows in self.blocks(copy=False):
+            for i in numpy.flatnonzero((rows >= 0).all(axis=1)):
+                winners.add(self.mayors[start + i])
+
+        return winners
+
+    def markov_chain(self, weighted=False, alpha=0.15, tol=1e-8, max_iter=1000):
+        """Markov-chain (MC4) aggregation over the majority relation.
+        Returns a list of (mayor, stationary probability) ordered by
+        probability decrescent.
+
+        The transition blocks are kept in RAM when they fit in
+        MARKOV_CACHE_BYTES, otherwise each power iteration streams over the
+        matrix in row blocks, so memory stays bounded by the block size.
+
+        Keyword arguments:
+            weighted -- move with probability proportional to the margin
+                (default False)
+            alpha -- jump probability (default 0.15)
+            tol -- stop when the L1 change is below tol (default 1e-8)
+            max_iter -- iteration cap (default 1000)
+        """
+        n_mayors = len(self.mayors)
+        top_margin = 1
+
+        if weighted:
+            top_margin = max(1, max(int(rows.max()) for _, rows in self.blocks(copy=False)))
+
+        def moves(rows):
+            # Row j, column i: probability of moving from i to j, times m.
+            # float32, so the products run in BLAS at half the traffic
+            if weighted:
+                return rows.clip(0).astype(numpy.float32) / numpy.float32(top_margin)
+            return (rows > 0).astype(numpy.float32)
+
+        cached = None
+
+        if n_mayors * n_mayors * 4 <= MARKOV_CACHE_BYTES:
+            cached = [(start, moves(rows)) for start, rows in self.blocks(copy=False)]
+
+        def transitions():
+            if cached is not None:
+                return cached
+            return ((start, moves(rows)) for start, rows in self.blocks(copy=False))
+
+        # Column sums are the probabilities of leaving each mayor
+        leave = numpy.zeros(n_mayors)
+
+        for _, block in transitions():
+            leave += block.sum(axis=0, dtype=numpy.float64)
+
+        stay = 1 - leave / n_mayors
+
+        def flow(x):
+            inflow = numpy.empty(n_mayors)
+            x = x.astype(numpy.float32)
+
+            for start, block in transitions():
+                inflow[start:start + len(block)] = block @ x
+
+            return inflow / n_mayors
+
+        x, _ = markov_chain(flow, stay, alpha, tol, max_iter)
+
+        return by_score(zip(self.mayors, x.tolist()))
+
+    def score(self, rule):
+        """Return a list of (mayor, score) ordered by mayor.
+
+        Keyword arguments:
+            rule -- pairwise rule name (ex.: copeland, simpson)
+        """
+        scores = getattr(self, rule)()
+        scores = list(zip(self.mayors, scores.tolist()))
+
+        # Ordered by mayor id crescent, as Profile.score
+        scores.sort(key=lambda x: x[0])
+
+        return scores
+
+    def ranking(self, rule):
+        """Return a list of (mayor, score) ordered by score descrescent.
+
+        Keyword arguments:
+            rule -- pairwise rule name (ex.: copeland, simpson)
+        """
+        return by_score(self.score(rule))
+
+    def close(self):
+        """Release the mapping, removing temporary files."""
+        self.net = None
+
+        if self._temporary and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
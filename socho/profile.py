@@ -9,16 +9,24 @@ Rodrigo Augusto Scheller Boos, May 2017
 For more information:
 https://github.com/qpwo/socho
 """
+import os
 import sys
 import math
 import copy
+import time
+import heapq
 import numpy
 from itertools import combinations, permutations
 
+from socho.scoring import Scoring, by_score
+
 sys.setrecursionlimit(1000000)
 
+# total votes X mayors up to which 'auto' searches Dodgson/Young exactly
+SMALL_PROFILE = 1000
+
 
-class Profile():
+class Profile(Scoring):
     """A profile is a set of (number of votes, ballot) pairs where a
     ballot is some ordering of the candidates.
 
@@ -36,11 +44,13 @@ class Profile():
         votes_per_mayor -- total votes for each mayor
     """
 
-    def __init__(self, pairs):
+    def __init__(self, pairs, n_jobs=None):
         """Set the properties.
 
         Keyword arguments:
             pairs -- a set of votes and mayors
+            n_jobs -- processes sharing the ballots to build the graphs,
+                serial if None or 1, all cores if -1 (default None)
         """
         # Set the pairs
         self.pairs = pairs
@@ -64,15 +74,61 @@ class Profile():
         # Get total number of votes
         self.total_votes = sum(votes)
 
-        # Create a Net Preference Graph
-        self.__calc_net_preference()
+        if n_jobs == -1:
+            n_jobs = os.cpu_count()
 
-        # Set votes_per_mayor for Plurality
-        self.__calc_votes_per_mayor()
+        if n_jobs is not None and n_jobs > 1:
+            # Net Preference Graph and votes_per_mayor from worker processes
+            self.__calc_statistics_parallel(n_jobs)
+        else:
+            # Create a Net Preference Graph
+            self.__calc_net_preference()
+
+            # Set votes_per_mayor for Plurality
+            self.__calc_votes_per_mayor()
 
         # Initialize a Path Preference Graph
         self.path_preference_graph = {mayor: dict() for mayor in self.mayors}
 
+    def add(self, pairs):
+        """Add (number of votes, ballot) pairs to the profile, updating the
+        statistics incrementally instead of rebuilding them.
+
+        Keyword arguments:
+            pairs -- an iterable of (number of votes, ballot)
+        """
+        # Check every ballot first, so a bad one leaves the profile untouched
+        pairs = [(n_votes, tuple(ballot)) for n_votes, ballot in pairs]
+
+        for _, ballot in pairs:
+            # Every ballot must rank the same mayors
+            if len(ballot) != len(self.mayors) or set(ballot) != self.mayors:
+                raise ValueError("ballot {} does not rank the profile's mayors".format(ballot))
+
+        # Current votes per ballot, a ballot may come in several pairs
+        counts = dict()
+
+        for n_votes, ballot in self.pairs:
+            counts[ballot] = counts.get(ballot, 0) + n_votes
+
+        for n_votes, ballot in pairs:
+            counts[ballot] = counts.get(ballot, 0) + n_votes
+            self.total_votes += n_votes
+
+            # Mayor at position i is preferred over every mayor after it
+            for i in range(len(ballot)):
+                mayor1 = ballot[i]
+                self.votes_per_mayor[i][mayor1] += n_votes
+
+                for mayor2 in ballot[i + 1:]:
+                    self.net_preference_graph[mayor1][mayor2] += n_votes
+                    self.net_preference_graph[mayor2][mayor1] -= n_votes
+
+        self.pairs = set((n_votes, ballot) for ballot, n_votes in counts.items())
+
+        # Path strengths are stale now
+        self.path_preference_graph = {mayor: dict() for mayor in self.mayors}
+
     # Mayor comparisons
     def net_preference(self, mayor1, mayor2):
         """Calculate preference between 2 mayors according to
@@ -215,6 +271,103 @@ class Profile():
         scores_rank = list(range(n_candidates, 0, -1))
         return list(zip(best_rank, scores_rank))
 
+    def plackett_luce(self, tol=1e-6, max_iter=1000, init=None):
+        """Plackett-Luce maximum-likelihood aggregation. Returns a list of
+        (mayor, strength) ordered by strength decrescent.
+
+        The strengths are fitted with vectorized minorize-maximize
+        iterations over the ballots. Without init, the fit starts from the
+        previous one, if any (i.e. before adding ballots).
+
+        Keyword arguments:
+            tol -- stop when no strength changes more than tol (default 1e-6)
+            max_iter -- iteration cap (default 1000)
+            init -- starting {mayor: strength} (default None)
+        """
+        from socho.pairwise import position_matrix
+        from socho import strength
+
+        mayors = sorted(self.mayors)
+        weights, positions = position_matrix(self.pairs, mayors)
+
+        start = self.__strength_start(mayors, init, '_plackett_luce')
+        gamma, _ = strength.plackett_luce(weights, positions, tol, max_iter, start)
+
+        self._plackett_luce = dict(zip(mayors, gamma.tolist()))
+        return by_score(self._plackett_luce.items())
+
+    def bradley_terry(self, tol=1e-6, max_iter=1000, init=None):
+        """Bradley-Terry maximum-likelihood aggregation from the pairwise
+        matrix alone. Returns a list of (mayor, strength) ordered by
+        strength decrescent.
+
+        Keyword arguments:
+            tol -- stop when no strength changes more than tol (default 1e-6)
+            max_iter -- iteration cap (default 1000)
+            init -- starting {mayor: strength} (default None)
+        """
+        from socho import strength
+
+        mayors = sorted(self.mayors)
+
+        # Complete ballots: wins[i, j] + wins[j, i] = total votes
+        net = numpy.array([[self.net_preference(mayor1, mayor2) for mayor2 in mayors]
+                           for mayor1 in mayors], dtype=numpy.int64)
+        wins = (self.total_votes + net) // 2
+        numpy.fill_diagonal(wins, 0)
+
+        start = self.__strength_start(mayors, init, '_bradley_terry')
+        gamma, _ = strength.bradley_terry(wins, tol, max_iter, start)
+
+        self._bradley_terry = dict(zip(mayors, gamma.tolist()))
+        return by_score(self._bradley_terry.items())
+
+    def markov_chain(self, weighted=False, alpha=0.15, tol=1e-8, max_iter=1000):
+        """Markov-chain (MC4) rank aggregation. Returns a list of
+        (mayor, stationary probability) ordered by probability decrescent.
+
+        From a mayor, the chain picks a mayor uniformly and moves there if
+        the majority prefers it. With weighted, it moves with probability
+        proportional to the majority margin instead (PageRank over the
+        margins). It's solved by power iteration over the sparse edges.
+
+        Keyword arguments:
+            weighted -- move with probability proportional to the margin
+                (default False)
+            alpha -- jump probability (default 0.15)
+            tol -- stop when the L1 change is below tol (default 1e-8)
+            max_iter -- iteration cap (default 1000)
+        """
+        from socho.pairwise import markov_chain
+
+        mayors = sorted(self.mayors)
+        n_mayors = len(mayors)
+        losers, winners, margins = list(), list(), list()
+
+        # Majority edges, from the loser to the winner
+        for i, mayor1 in enumerate(mayors):
+            for j, mayor2 in enumerate(mayors):
+                margin = self.net_preference(mayor2, mayor1)
+
+                if margin > 0:
+                    losers.append(i)
+                    winners.append(j)
+                    margins.append(margin if weighted else 1)
+
+        losers = numpy.array(losers, dtype=numpy.intp)
+        winners = numpy.array(winners, dtype=numpy.intp)
+
+        # Moving probabilities
+        moves = numpy.array(margins, dtype=float) / (max(margins, default=1) * n_mayors)
+        stay = 1 - numpy.bincount(losers, weights=moves, minlength=n_mayors)
+
+        def flow(x):
+            return numpy.bincount(winners, weights=x[losers] * moves, minlength=n_mayors)
+
+        x, _ = markov_chain(flow, stay, alpha, tol, max_iter)
+
+        return by_score(zip(mayors, x.tolist()))
+
     def schulze(self, mayor):
         """Return the total mayor's wins with Schulze method.
 
@@ -239,51 +392,120 @@ class Profile():
         # Return total number of wins
         return sum(wins)
 
-    def ranking(self, scorer):
-        """Returns a set of mayor winners according to some score function
+    def top_k(self, scorer, k):
+        """Returns the first k (mayor, score) of ranking(scorer), without
+        scoring and sorting every mayor.
+
+        For positional scores (borda, dowdall) mayors are seen position by
+        position, from the top of the ballots, and the search stops once no
+        unseen mayor can reach the current k-th score. Other scorers score
+        every mayor but keep only the best k.
 
         Keyword arguments:
             scorer -- score function (ex.: borda, copeland)
+            k -- number of mayors
         """
-        # A list of (mayor, score)
-        scores = self.score(scorer)
+        # As ranking(scorer)[:k]
+        if k <= 0:
+            return list()
 
-        # Ranking is the score list ordered by score descrescent
-        scores.sort(key=lambda x: x[1], reverse=True)
+        # Order of ranking(scorer): score descrescent, then mayor id crescent
+        def key(x):
+            return (-x[1], x[0])
 
-        return scores
+        name = getattr(scorer, '__name__', None)
 
-    def score(self, scorer):
-        """Returns a set of mayor according to some score function.
+        if getattr(scorer, '__self__', None) is not self or name not in ('borda', 'dowdall'):
+            return heapq.nsmallest(k, self.score(scorer), key=key)
 
-        Keyword arguments:
-            scorer -- score function (ex.: borda, copeland)
-        """
-        # A list of (mayor, score)
-        scores = [(mayor, scorer(mayor)) for mayor in self.mayors]
+        points = self.__positional_points()[name]
+        pairs, positions = self.__ballot_positions()
+
+        def score(mayor):
+            # Same terms, in the same order, as the scorer's sum
+            return sum([n_votes * points[ballot_positions[mayor]]
+                        for (n_votes, _), ballot_positions in zip(pairs, positions)])
+
+        seen = dict()  # mayor -> score
+        best = list()  # min-heap of the best k scores seen
+
+        for i in range(len(self.mayors)):
+            # Sorted access: mayors at position i
+            for _, ballot in pairs:
+                mayor = ballot[i]
 
-        # Ranking is the score list ordered by mayor id crescent
-        scores.sort(key=lambda x: x[0])
+                if mayor not in seen:
+                    seen[mayor] = score(mayor)  # random access
+                    heapq.heappush(best, seen[mayor])
 
-        return scores
+                    if len(best) > k:
+                        heapq.heappop(best)
 
-    def winners(self, scorer):
-        """Returns a set of mayor winners according to some score function
+            # Unseen mayors are below position i in every ballot
+            if i + 1 < len(self.mayors) and len(best) == k:
+                threshold = sum([n_votes * points[i + 1] for n_votes, _ in pairs])
+
+                if best[0] > threshold:
+                    break
+
+        return heapq.nsmallest(k, seen.items(), key=key)
+
+    def margin_of_victory(self, scorer):
+        """Calculate, for each winner, how many ballots must change so that
+        some other mayor beats him. Returns {winner: (margin, witness)},
+        where the witness is a list of (number of voters, ballot, new
+        ballot) changes achieving it (margin is inf if none can).
+
+        Works for borda, dowdall, plurality (first choices) and copeland,
+        in polynomial time. The positional margins are exact, the Copeland
+        one is a greedy upper bound (see socho.robustness).
 
         Keyword arguments:
-            scorer -- score function (ex.: borda, copeland)
+            scorer -- score function (ex.: borda, copeland, plurality)
         """
-        ranking = self.ranking(scorer)  # get ranking
-        best_score = ranking[0][1]      # get best score first tuple in ranking
+        from socho.pairwise import position_matrix
+        from socho import robustness
 
-        # Filter ranking to get all best score
-        bests = list(filter(lambda x: x[1] == best_score, ranking))
+        name = getattr(scorer, '__name__', None)
 
-        # Get only the mayors
-        winners, scores = zip(*bests)
+        mayors = sorted(self.mayors)
 
-        # Return a set of winners
-        return set(winners)
+        pairs = list(self.pairs)
+        weights, positions = position_matrix(pairs, mayors)
+
+        positional = self.__positional_points()
+
+        if name in positional:
+            points = numpy.asarray(positional[name])
+            scores = weights @ points[positions]
+        elif name == 'copeland':
+            net = numpy.array([[self.net_preference(mayor1, mayor2) for mayor2 in mayors]
+                               for mayor1 in mayors], dtype=numpy.int64)
+            scores = numpy.sign(net).sum(axis=1)
+        else:
+            raise ValueError("no margin of victory for {!r}".format(name))
+
+        margins = dict()
+
+        for winner in numpy.flatnonzero(scores == scores.max()):
+            if name in positional:
+                margin, challenger, changes = robustness.positional_margin(weights, positions, points, winner)
+            else:
+                margin, challenger, changes = robustness.copeland_margin(weights, positions, net, winner)
+
+            # Challenger on top, winner at the bottom, the others in order
+            witness = list()
+
+            for u, n_voters in changes:
+                ballot = pairs[u][1]
+                others = [m for m in ballot if m not in (mayors[challenger], mayors[winner])]
+                new_ballot = (mayors[challenger],) + tuple(others) + (mayors[winner],)
+
+                witness.append((n_voters, ballot, new_ballot))
+
+            margins[mayors[winner]] = (margin, witness)
+
+        return margins
 
     def condorcet_winners(self):
         """Calculate the Condorcet Winners and returns a set of winner mayors"""
@@ -352,6 +574,43 @@ class Profile():
 
         return set(winners)
 
+    def chamberlin_courant(self, n=1):
+        """Select a committee with the Chamberlin-Courant rule, each vote
+        scoring the Borda points of its favourite member, with lazy greedy.
+        Returns a set of winner mayors.
+
+        Keyword arguments:
+            n -- committee size
+        """
+        from socho import committee
+
+        return self.__committee(committee.chamberlin_courant, n)
+
+    def proportional_approval(self, n=1, approval=None):
+        """Select a committee with Proportional Approval Voting, each vote
+        approving its top mayors, with lazy greedy. Returns a set of winner
+        mayors.
+
+        Keyword arguments:
+            n -- committee size
+            approval -- approved positions per ballot (default n)
+        """
+        from socho import committee
+
+        return self.__committee(committee.proportional_approval, n, approval)
+
+    def monroe(self, n=1):
+        """Select a committee with the greedy Monroe approximation, each
+        member representing an equal share of the votes. Returns a set of
+        winner mayors.
+
+        Keyword arguments:
+            n -- committee size
+        """
+        from socho import committee
+
+        return self.__committee(committee.monroe, n)
+
     def sequential_majority_comparison(self):
         """Find a winner using the Sequential Majority Comparison method and
         returns the winner mayor."""
@@ -424,6 +683,207 @@ class Profile():
         return simpson[0][0]
 
 
+    def dodgson(self, mayor, method='auto', max_nodes=100000, max_seconds=None):
+        """Calculate minus the Dodgson score for a mayor, so the mayor
+        closest to be a Condorcet winner ranks first.
+
+        See dodgson_score for the keyword arguments.
+        """
+        return -self.dodgson_score(mayor, method, max_nodes, max_seconds)[0]
+
+    def dodgson_score(self, mayor, method='auto', max_nodes=100000, max_seconds=None):
+        """Calculate the Dodgson score for a mayor: the least number of
+        swaps of adjacent mayors in the ballots that make him a Condorcet
+        winner (as in condorcet_winners). Returns (score, exact).
+
+        Exact computation is NP-hard, so the 'exact' method is a breadth
+        first search over swap states, with memoization of the visited
+        ones, bounded by max_nodes and max_seconds. If the budget runs
+        out, the best bound found (a greedy upper bound) is returned with
+        exact False. The 'tideman' method is Tideman's polynomial
+        approximation, the sum of the pairwise deficits.
+
+        Keyword arguments:
+            mayor -- base mayor for scoring
+            method -- 'exact', 'tideman' or 'auto', exact for small
+                profiles (default 'auto')
+            max_nodes -- states visited by the exact search (default 100000)
+            max_seconds -- time spent by the exact search (default None)
+        """
+        others = [m for m in self.mayors if m != mayor]
+
+        # Deficits against every other mayor
+        deficits = [max(0, -self.net_preference(mayor, m)) for m in others]
+
+        if method == 'auto':
+            method = 'exact' if self.total_votes * len(self.mayors) <= SMALL_PROFILE else 'tideman'
+
+        if method == 'tideman':
+            return sum(deficits), False
+
+        if method != 'exact':
+            raise ValueError("unknown method {!r}".format(method))
+
+        # Each swap of mayor over m in a ballot adds 2 to the net preference
+        needed = tuple((deficit + 1) // 2 for deficit in deficits)
+
+        if not any(needed):
+            return 0, True
+
+        index = {m: i for i, m in enumerate(others)}
+
+        # Mayors above mayor in each ballot, nearest first
+        above = list()
+        start = list()
+
+        for n_votes, ballot in self.pairs:
+            p = ballot.index(mayor)
+
+            if p > 0:
+                above.append(tuple(index[m] for m in reversed(ballot[:p])))
+                start.append((n_votes,) + (0,) * p)  # voters by number of swaps
+
+        upper = self.__dodgson_greedy(above, start, needed)
+        deadline = None if max_seconds is None else time.monotonic() + max_seconds
+
+        # Breadth first search over (voters by number of swaps) per ballot
+        frontier = {tuple(start): needed}
+        visited = set(frontier)
+        depth = 0
+
+        while frontier and depth + 1 < upper:
+            depth += 1
+            new_frontier = dict()
+
+            for state, need in frontier.items():
+                for u, voters in enumerate(state):
+                    for level in range(len(voters) - 1):
+                        # Only swap toward someone still needed
+                        if voters[level] == 0 or not any(need[d] for d in above[u][level:]):
+                            continue
+
+                        moved = list(voters)
+                        moved[level] -= 1
+                        moved[level + 1] += 1
+
+                        new_state = state[:u] + (tuple(moved),) + state[u + 1:]
+
+                        if new_state in visited:
+                            continue
+
+                        d = above[u][level]
+                        new_need = need[:d] + (max(0, need[d] - 1),) + need[d + 1:]
+
+                        if not any(new_need):
+                            return depth, True
+
+                        visited.add(new_state)
+                        new_frontier[new_state] = new_need
+
+                        # Out of budget, return the best bound
+                        if len(visited) > max_nodes or (deadline is not None and time.monotonic() > deadline):
+                            return upper, False
+
+            frontier = new_frontier
+
+        # Nothing better than the greedy bound
+        return upper, True
+
+    def young(self, mayor, method='auto', max_nodes=100000, max_seconds=None):
+        """Calculate minus the Young score for a mayor, so the mayor
+        closest to be a Condorcet winner ranks first.
+
+        See young_score for the keyword arguments.
+        """
+        return -self.young_score(mayor, method, max_nodes, max_seconds)[0]
+
+    def young_score(self, mayor, method='auto', max_nodes=100000, max_seconds=None):
+        """Calculate the Young score for a mayor: the least number of
+        voters to remove so that he is a Condorcet winner (as in
+        condorcet_winners). Returns (score, exact).
+
+        The 'exact' method is a breadth first search over the number of
+        voters removed per ballot, with memoization of the visited states,
+        bounded by max_nodes and max_seconds. If the budget runs out, the
+        best bound found (a greedy upper bound) is returned with exact
+        False. The 'greedy' method only computes that bound.
+
+        Keyword arguments:
+            mayor -- base mayor for scoring
+            method -- 'exact', 'greedy' or 'auto', exact for small
+                profiles (default 'auto')
+            max_nodes -- states visited by the exact search (default 100000)
+            max_seconds -- time spent by the exact search (default None)
+        """
+        others = [m for m in self.mayors if m != mayor]
+        net = tuple(self.net_preference(mayor, m) for m in others)
+
+        if all(n >= 0 for n in net):
+            return 0, True
+
+        # Removing a voter changes the net preference by -1 where he
+        # prefers mayor, +1 where he prefers the other one. Voters with
+        # mayor on top are never worth removing.
+        ballots = list()
+
+        for n_votes, ballot in self.pairs:
+            p = ballot.index(mayor)
+
+            if p > 0:
+                ahead = set(ballot[:p])
+                ballots.append((n_votes, tuple(1 if m in ahead else -1 for m in others)))
+
+        if method == 'auto':
+            method = 'exact' if self.total_votes * len(self.mayors) <= SMALL_PROFILE else 'greedy'
+
+        upper = self.__young_greedy(ballots, net)
+
+        if method == 'greedy':
+            return upper, False
+
+        if method != 'exact':
+            raise ValueError("unknown method {!r}".format(method))
+
+        deadline = None if max_seconds is None else time.monotonic() + max_seconds
+
+        # Breadth first search over voters removed per ballot
+        start = (0,) * len(ballots)
+        frontier = {start: net}
+        visited = {start}
+        depth = 0
+
+        while frontier and depth + 1 < upper:
+            depth += 1
+            new_frontier = dict()
+
+            for state, state_net in frontier.items():
+                for u, (n_votes, changes) in enumerate(ballots):
+                    if state[u] == n_votes:
+                        continue
+
+                    new_state = state[:u] + (state[u] + 1,) + state[u + 1:]
+
+                    if new_state in visited:
+                        continue
+
+                    new_net = tuple(n + c for n, c in zip(state_net, changes))
+
+                    if all(n >= 0 for n in new_net):
+                        return depth, True
+
+                    visited.add(new_state)
+                    new_frontier[new_state] = new_net
+
+                    # Out of budget, return the best bound
+                    if len(visited) > max_nodes or (deadline is not None and time.monotonic() > deadline):
+                        return upper, False
+
+            frontier = new_frontier
+
+        # Nothing better than the greedy bound
+        return upper, True
+
+
     def kendalltau_dist(self, rank_a, rank_b):
         """Calculates the Kendall Tau distance.
 
@@ -595,6 +1055,171 @@ class Profile():
             for n_votes, ballot in self.pairs:
                 self.votes_per_mayor[i][ballot[i]] += n_votes
 
+    def __calc_statistics_parallel(self, n_jobs):
+        """Create the Net Preference Graph and votes_per_mayor from
+        matrices summed over ballot shards in worker processes.
+
+        Keyword arguments:
+            n_jobs -- number of worker processes
+        """
+        from socho.pairwise import parallel_statistics
+
+        # Create an iterable for mayors
+        mayors = list(self.mayors)
+
+        # Number of mayors
+        n_mayors = len(mayors)
+
+        net, counts = parallel_statistics(self.pairs, mayors, n_jobs)
+
+        # Same graph (and insertion order) as __calc_net_preference
+        self.net_preference_graph = {mayor: dict() for mayor in mayors}
+
+        for i in range(n_mayors):
+            mayor1 = mayors[i]
+
+            # A mayor against himself is 0
+            self.net_preference_graph[mayor1][mayor1] = 0
+
+            for j in range(i + 1, n_mayors):
+                mayor2 = mayors[j]
+
+                self.net_preference_graph[mayor1][mayor2] = net[i, j]  # mayor1 VS mayor2
+                self.net_preference_graph[mayor2][mayor1] = net[j, i]  # mayor2 VS mayor1
+
+        # Same structure as __calc_votes_per_mayor
+        self.votes_per_mayor = [{mayor: int(counts[i, j]) for j, mayor in enumerate(mayors)}
+                                for i in range(n_mayors)]
+
+    def __ballot_positions(self):
+        """Return (pairs list, list of {mayor: position} per ballot),
+        in the iteration order of self.pairs."""
+        if getattr(self, '_ballot_positions', None) is None or self._ballot_positions[0] is not self.pairs:
+            pairs = list(self.pairs)
+            positions = [{mayor: i for i, mayor in enumerate(ballot)} for _, ballot in pairs]
+
+            self._ballot_positions = (self.pairs, pairs, positions)
+
+        return self._ballot_positions[1:]
+
+    def __dodgson_greedy(self, above, start, needed):
+        """Upper bound for the Dodgson score: repeatedly lift the voter
+        that reaches a still needed mayor with the fewest swaps.
+
+        Keyword arguments:
+            above -- per ballot, indexes of the mayors above, nearest first
+            start -- per ballot, (number of voters, 0, 0...) by swaps
+            needed -- swaps still needed over each other mayor
+        """
+        voters = [list(v) for v in start]
+        needed = list(needed)
+        swaps = 0
+
+        while any(needed):
+            best = None
+
+            for u in range(len(voters)):
+                for level in range(len(voters[u]) - 1):
+                    if voters[u][level] == 0:
+                        continue
+
+                    # Swaps to pass the nearest needed mayor
+                    for j in range(level, len(above[u])):
+                        if needed[above[u][j]] > 0:
+                            cost = j - level + 1
+
+                            if best is None or cost < best[0]:
+                                best = (cost, u, level)
+                            break
+
+            cost, u, level = best
+
+            # Lift one voter, passing everyone on the way
+            for j in range(level, level + cost):
+                d = above[u][j]
+                needed[d] = max(0, needed[d] - 1)
+
+            voters[u][level] -= 1
+            voters[u][level + cost] += 1
+            swaps += cost
+
+        return swaps
+
+    def __young_greedy(self, ballots, net):
+        """Upper bound for the Young score: repeatedly remove voters of the
+        ballot that reduces the total deficit the most.
+
+        Keyword arguments:
+            ballots -- (number of voters, net preference changes) pairs
+            net -- net preferences of the mayor over the others
+        """
+        left = [n_votes for n_votes, _ in ballots]
+        net = list(net)
+        removed = 0
+
+        def deficit(values):
+            return sum(max(0, -n) for n in values)
+
+        while any(n < 0 for n in net):
+            best = None
+
+            # A deficit means someone left prefers the other mayor
+            for u, (_, changes) in enumerate(ballots):
+                if left[u] == 0:
+                    continue
+
+                gain = deficit(net) - deficit(n + c for n, c in zip(net, changes))
+
+                if best is None or gain > best[0]:
+                    best = (gain, u)
+
+            _, u = best
+            changes = ballots[u][1]
+
+            # Remove in batch while every deficit keeps its direction
+            batch = [left[u]]
+            batch += [-n for n, c in zip(net, changes) if c > 0 and n < 0]
+            batch += [n for n, c in zip(net, changes) if c < 0 and n > 0]
+            batch = max(1, min(batch))
+
+            net = [n + batch * c for n, c in zip(net, changes)]
+            left[u] -= batch
+            removed += batch
+
+        return removed
+
+    def __positional_points(self):
+        """Points per position of the positional rules, written as in their
+        scores: {rule name: points, from the top position}."""
+        top_score = len(self.mayors) - 1
+        positions = range(len(self.mayors))
+
+        return {
+            'borda': [top_score - i for i in positions],
+            'dowdall': [(top_score - i) / (i + 1) for i in positions],
+            'plurality': [int(i == 0) for i in positions],
+        }
+
+    def __committee(self, rule, n, *args):
+        """Run a socho.committee rule and return the set of mayors."""
+        from socho.pairwise import position_matrix
+
+        mayors = sorted(self.mayors)
+        weights, positions = position_matrix(self.pairs, mayors)
+
+        return {mayors[c] for c in rule(weights, positions, n, *args)}
+
+    def __strength_start(self, mayors, init, previous):
+        """Starting strengths aligned with mayors: init, else the previous
+        fit stored in the previous attribute, else None (uniform)."""
+        if init is None:
+            init = getattr(self, previous, None)
+
+        if init is None:
+            return None
+
+        return [init.get(mayor, 0) for mayor in mayors]
+
     def __calc_path_preference(self):
         """Calculate paths' strengths for Schulze method."""
 
@@ -652,19 +1277,17 @@ class Profile():
 
         n_mayors = len(mayors)  # number of mayors
         paths = list()          # list of possible paths
-        path = list()           # list of weights
 
         # For each mayor that is not mayor1...
         for mayor in mayors:
 
-            # Get preference of mayor1 over mayor
+            # Get preference of mayor1 over mayor, the path's first weight
             preference = self.net_preference_graph[mayor1][mayor]
-            path.append(preference)  # save current weigth
+            path = [preference]
 
             # End of path
             if mayor == mayor2:
                 paths.append(path)       # add to possible paths
-                path = list()            # start a new path
             else: # path isn't over
                 new_mayors = mayors - {mayor}
                 subpath = self.__calc_paths(mayor, mayor2, new_mayors)
@@ -707,6 +1330,25 @@ class Profile():
 
         return edge_weights
 
+    def summary(self):
+        """Return a ProfileSummary (pairwise matrix and position counts)
+        that can be serialized and merged with other profiles' summaries."""
+        from socho.summary import ProfileSummary
+
+        return ProfileSummary.from_pairs(self.pairs, sorted(self.mayors))
+
+    def pairwise_store(self, path=None, tile=1024):
+        """Return a disk-backed PairwiseStore of the net preferences,
+        for rules streaming over the pairwise matrix in row blocks.
+
+        Keyword arguments:
+            path -- file to map, a temporary file if None (default None)
+            tile -- tile side, in mayors (default 1024)
+        """
+        from socho.pairwise import PairwiseStore
+
+        return PairwiseStore.build(self.pairs, sorted(self.mayors), path, tile)
+
     @classmethod
     def ballot_box(cls, choices):
         """Index and order choices for Profile.
@@ -0,0 +1,50 @@
+"""A lightweight reader for the scores files used by the CLI, so reading a
+file doesn't cost a pandas import.
+
+A scores file has a header line with the voters' names and one line per
+mayor: the mayor's label followed by one score per voter, i.e.
+
+    "voter1"	"voter2"	"voter3"
+    "895"	0.16	0.65	0.63
+    "157"	0.82	0.72	0.67
+"""
+import csv
+import numpy
+
+
+def _label(text):
+    """Return a label as int when it looks like one, like pandas does."""
+    try:
+        return int(text)
+    except ValueError:
+        return text
+
+
+def read_scores(filepath, sep='\t'):
+    """Read a scores file and return (mayors labels, mayors X votes matrix).
+
+    Keyword arguments:
+        filepath -- path to the scores file
+        sep -- field separator (default '\\t')
+    """
+    with open(filepath, 'r', newline='') as f:
+        lines = csv.reader(f, delimiter=sep)
+
+        header = next(lines)                       # voters' names
+        rows = [row for row in lines if row]       # skip blank lines
+
+    if not rows:
+        return list(), numpy.zeros((0, len(header)))
+
+    # Rows with one more field than the header start with a label,
+    # otherwise mayors are labeled by line number
+    if len(rows[0]) > len(header):
+        mayors = [_label(row[0]) for row in rows]
+        rows = [row[1:] for row in rows]
+    else:
+        mayors = list(range(len(rows)))
+
+    # Empty fields are missing scores
+    data = numpy.array([[field or 'nan' for field in row] for row in rows], dtype=float)
+
+    return mayors, data
@@ -0,0 +1,147 @@
+"""Margin of victory: how many ballots must change to flip a winner.
+
+A ballot change here rewrites a voter's ballot putting a challenger on
+top and the winner at the bottom, the other mayors keeping their order.
+That's the most a single ballot can do for the challenger against the
+winner, and the smallest count over the challengers is the margin.
+
+For positional rules with non increasing points each rewrite adds a fixed
+gain to the challenger's lead, so rewriting the highest-gain voters first
+is optimal and the margin is exact. For Copeland rewrites interact
+through the pairwise contests, so the ballots are picked greedily on the
+pairwise margins, in polynomial time, and the margin is an upper bound.
+
+The functions return (margin, challenger, changes) where changes is a
+list of (ballot row, number of voters rewritten), or (math.inf, None, [])
+when no challenger can win.
+"""
+import math
+import numpy
+
+
+def positional_margin(weights, positions, points, winner):
+    """Margin of victory of a positional scoring rule, highest-gain
+    voters first.
+
+    Keyword arguments:
+        weights -- votes per ballot
+        positions -- ballot position matrix
+        points -- points per position, non increasing
+        winner -- column of the winner
+    """
+    points = numpy.asarray(points)
+    scores = weights @ points[positions]
+
+    best = (math.inf, None, list())
+
+    for challenger in range(positions.shape[1]):
+        if challenger == winner:
+            continue
+
+        # Points to catch up, and what a rewritten voter of each ballot gives
+        deficit = scores[winner] - scores[challenger]
+        gains = (points[0] - points[positions[:, challenger]]) + \
+                (points[positions[:, winner]] - points[-1])
+
+        changes = list()
+        voters = 0
+
+        # Strictly ahead of the winner
+        for u in numpy.argsort(-gains, kind='stable'):
+            if deficit < 0 or gains[u] <= 0 or voters >= best[0]:
+                break
+
+            # Voters of this ballot needed, at most all of them
+            needed = math.floor(deficit / gains[u]) + 1
+            taken = int(min(weights[u], needed))
+
+            changes.append((int(u), taken))
+            voters += taken
+            deficit -= taken * gains[u]
+
+        if deficit < 0 and voters < best[0]:
+            best = (voters, challenger, changes)
+
+    return best
+
+
+def copeland_margin(weights, positions, net, winner):
+    """Margin of victory of Copeland, greedy over the pairwise margins.
+
+    Keyword arguments:
+        weights -- votes per ballot
+        positions -- ballot position matrix
+        net -- net preference matrix, as a numpy array
+        winner -- column of the winner
+    """
+    n_mayors = positions.shape[1]
+    best = (math.inf, None, list())
+
+    for challenger in range(n_mayors):
+        if challenger == winner:
+            continue
+
+        result = _copeland_challenge(weights, positions, net, winner, challenger, best[0])
+
+        if result is not None and result[0] < best[0]:
+            best = (result[0], challenger, result[1])
+
+    return best
+
+
+def _copeland_challenge(weights, positions, net, winner, challenger, limit):
+    """Greedy rewrites putting challenger above the winner's Copeland
+    score. Returns (voters, changes), or None past limit or if stuck."""
+    net_c = net[challenger].astype(numpy.int64)  # challenger's contests
+    net_w = net[winner].astype(numpy.int64)      # winner's contests
+
+    # Mayors above the challenger / below the winner, per ballot
+    above = positions < positions[:, challenger, None]
+    below = positions > positions[:, winner, None]
+
+    # The challenger-winner contest is counted in net_c only
+    below[:, challenger] = False
+
+    left = numpy.asarray(weights, dtype=numpy.int64).copy()
+    limit = min(limit, int(left.sum()) + 1)
+    changes = dict()
+    voters = 0
+
+    def copeland(row):
+        return int(numpy.sign(row).sum())
+
+    while copeland(net_c) <= copeland(net_w):
+        if voters >= limit:
+            return None
+
+        # Contests still worth pushing: challenger not winning them,
+        # winner not losing them. Closer ones are worth more.
+        useful_c = net_c <= 0
+        useful_c[challenger] = False
+        useful_w = net_w >= 0
+        useful_w[winner] = False
+
+        steps_c = numpy.where(net_c < 0, (-net_c + 1) // 2, 1)
+        steps_w = numpy.where(net_w > 0, (net_w + 1) // 2, 1)
+
+        values = above @ (useful_c / steps_c) + below @ (useful_w / steps_w)
+        values[left == 0] = 0
+
+        u = int(numpy.argmax(values))
+
+        if values[u] <= 0:
+            return None
+
+        # Rewrite voters until the nearest contest it pushes changes sign
+        affected = numpy.concatenate([steps_c[above[u] & useful_c], steps_w[below[u] & useful_w]])
+        taken = int(min(left[u], affected.min(), limit - voters))
+
+        net_c[above[u]] += 2 * taken
+        net_w[below[u]] -= 2 * taken
+        net_w[challenger] = -net_c[winner]
+
+        left[u] -= taken
+        voters += taken
+        changes[u] = changes.get(u, 0) + taken
+
+    return voters, sorted(changes.items())
@@ -0,0 +1,54 @@
+"""Scores and rankings shared by the profile classes.
+
+Profile, ProfileSummary and TruncatedProfile all score one mayor at a
+time with a scorer function and rank the mayors the same way: by score
+decrescent, ties by mayor id crescent.
+"""
+
+
+def by_score(scores):
+    """Return a list of (mayor, score) ordered by score decrescent, ties
+    by mayor crescent.
+
+    Keyword arguments:
+        scores -- an iterable of (mayor, score)
+    """
+    ranking = sorted(scores, key=lambda x: x[0])
+    ranking.sort(key=lambda x: x[1], reverse=True)
+
+    return ranking
+
+
+class Scoring():
+    """score, ranking and winners of a scorer, for classes with a mayors
+    property."""
+
+    def ranking(self, scorer):
+        """Returns a list of (mayor, score) ordered by score descrescent.
+
+        Keyword arguments:
+            scorer -- score function (ex.: borda, copeland)
+        """
+        return by_score(self.score(scorer))
+
+    def score(self, scorer):
+        """Returns a list of (mayor, score) ordered by mayor.
+
+        Keyword arguments:
+            scorer -- score function (ex.: borda, copeland)
+        """
+        scores = [(mayor, scorer(mayor)) for mayor in self.mayors]
+        scores.sort(key=lambda x: x[0])
+
+        return scores
+
+    def winners(self, scorer):
+        """Returns a set of mayor winners according to some score function
+
+        Keyword arguments:
+            scorer -- score function (ex.: borda, copeland)
+        """
+        ranking = self.ranking(scorer)
+        best_score = ranking[0][1]
+
+        return {mayor for mayor, score in ranking if score == best_score}
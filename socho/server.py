@@ -0,0 +1,437 @@
+"""A long-running aggregation server, so interactive clients pay the
+import and parsing cost once instead of on every CLI call.
+
+The server speaks JSON lines, over stdin/stdout or a local socket. Each
+request is an object with an "op" and, usually, a "profile" name:
+
+    {"id": 1, "op": "load", "profile": "p", "path": "tests/input.txt"}
+    {"id": 2, "op": "upload", "profile": "q", "pairs": [[40, [0, 1, 2]], [28, [1, 2, 0]]]}
+    {"id": 3, "op": "add", "profile": "q", "pairs": [[32, [2, 1, 0]]]}
+    {"id": 4, "op": "query", "profile": "p", "rule": "borda"}
+    {"id": 5, "op": "drop", "profile": "q"}
+    {"id": 6, "op": "list"}
+
+"upload" and "add" take either "pairs" of (number of votes, ballot) or
+"scores", a (votes X mayors) matrix as accepted by Profile.ballot_box.
+
+Every response echoes the request "id" together with "ok" and either a
+"result" or an "error". Requests are handled concurrently, so responses
+may come back out of order; heavy rules run in a process pool.
+
+Usage:
+    socho serve [--socket PATH | --port PORT] [--memory MB] [--workers N]
+"""
+import os
+import sys
+import json
+import stat
+import pickle
+import asyncio
+import argparse
+import functools
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from socho.profile import Profile
+
+
+# Rules that score one mayor at a time and are answered with a ranking
+SCORERS = {'borda', 'dowdall', 'copeland', 'simpson', 'symmetric_borda', 'schulze',
+           'dodgson', 'young'}
+
+# Rules called directly on the profile
+CALLS = {'kemeny_young', 'condorcet_winners', 'raynaud',
+         'plackett_luce', 'bradley_terry', 'markov_chain',
+         'chamberlin_courant', 'proportional_approval', 'monroe',
+         'margin_of_victory'}
+
+# Rules taking a scorer, named by args["scorer"] (ex.: borda)
+SCORER_ARGS = {'margin_of_victory'}
+
+# Rules answered from the profile's ProfileSummary (Profile.kemeny_young
+# fails on numpy 2)
+SUMMARY = {'kemeny_young'}
+
+# Rules sent to the worker pool so they don't block the fast ones. The
+# strength fits stay out: they warm start from the resident profile's
+# previous fit, which a pickled snapshot would drop
+HEAVY = {'kemeny_young', 'schulze', 'dodgson', 'young'}
+
+
+def run_rule(profile, rule, args=None):
+    """Run a social choice rule on a profile and return its result.
+
+    Keyword arguments:
+        profile -- a Profile
+        rule -- rule name (ex.: borda, kemeny_young)
+        args -- keyword arguments for the rule (default None)
+    """
+    args = args or dict()
+
+    if rule not in SCORERS and rule not in CALLS:
+        raise ValueError("unknown rule {!r}".format(rule))
+
+    method = getattr(profile, rule)
+
+    if rule in SCORERS:
+        scorer = functools.partial(method, **args) if args else method
+        return profile.ranking(scorer)
+
+    if rule in SUMMARY:
+        method = getattr(profile.summary(), rule)
+
+    if rule in SCORER_ARGS:
+        args = dict(args, scorer=getattr(profile, args.get('scorer', 'borda')))
+
+    return method(**args)
+
+
+def _run_pickled(blob, rule, args):
+    """Worker pool entry point: unpickle a profile snapshot and run a rule."""
+    return run_rule(pickle.loads(blob), rule, args)
+
+
+def _estimate_size(profile):
+    """Rough number of bytes held by a profile (Python dicts of ints)."""
+    n_mayors = len(profile.mayors)
+    n_pairs = len(profile.pairs)
+
+    graphs = 2 * 100 * n_mayors * n_mayors  # net preference and votes per mayor
+    ballots = n_pairs * (8 * n_mayors + 100)
+
+    return graphs + ballots
+
+
+def _pairs(request):
+    """Get (number of votes, ballot) pairs from an upload/add request, one
+    pair per ballot so a set of them keeps every vote."""
+    if 'pairs' in request:
+        counts = dict()
+
+        for n_votes, ballot in request['pairs']:
+            ballot = tuple(ballot)
+            counts[ballot] = counts.get(ballot, 0) + int(n_votes)
+
+        return [(n_votes, ballot) for ballot, n_votes in counts.items()]
+
+    if 'scores' in request:
+        return list(Profile.ballot_box(request['scores']).pairs)
+
+    raise ValueError("request needs 'pairs' or 'scores'")
+
+
+def _relabel(result, labels):
+    """Map mayors indexes in a rule result back to their labels."""
+    def label(mayor):
+        return mayor if labels is None else labels[mayor]
+
+    # margin_of_victory: {winner: (margin, witness)}, as a list of objects
+    # so labels needn't be JSON keys and no margin is inf
+    if isinstance(result, dict):
+        return [{'winner': label(winner),
+                 'margin': None if margin == float('inf') else margin,
+                 'witness': [(n_voters, [label(mayor) for mayor in ballot],
+                              [label(mayor) for mayor in new_ballot])
+                             for n_voters, ballot, new_ballot in witness]}
+                for winner, (margin, witness) in sorted(result.items(), key=lambda x: label(x[0]))]
+
+    if labels is None:
+        return result
+
+    if isinstance(result, (set, frozenset)):
+        return sorted(labels[mayor] for mayor in result)
+
+    if isinstance(result, list):
+        return [(labels[mayor], score) for mayor, score in result]
+
+    return labels[result]
+
+
+def _to_json(obj):
+    """json.dumps fallback for numpy scalars and sets."""
+    if hasattr(obj, 'item'):
+        return obj.item()
+
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj)
+
+    raise TypeError("{!r} is not JSON serializable".format(obj))
+
+
+class FileReader():
+    """Line reader over a regular file, which asyncio can't watch: reads
+    run in a thread, as the StreamReader.readline they stand for."""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    async def readline(self):
+        return await asyncio.to_thread(self.stream.readline)
+
+
+class Entry():
+    """A resident profile.
+
+    Properties:
+        ready -- future set once the profile is built
+        profile -- the Profile (None while building)
+        labels -- mayors labels, when loaded from a scores file
+        size -- estimated size in bytes
+    """
+
+    def __init__(self, loop):
+        self.ready = loop.create_future()
+        self.profile = None
+        self.labels = None
+        self.size = 0
+
+
+class ProfileCache():
+    """Resident profiles kept under a memory budget, least recently used
+    profiles are evicted first.
+
+    Properties:
+        budget -- memory budget in bytes
+        entries -- OrderedDict of name -> Entry, oldest first
+    """
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.entries = OrderedDict()
+
+    def __contains__(self, name):
+        return name in self.entries
+
+    def get(self, name):
+        """Return an entry and mark it as recently used."""
+        if name not in self.entries:
+            raise KeyError("unknown profile {!r}".format(name))
+
+        self.entries.move_to_end(name)
+        return self.entries[name]
+
+    def put(self, name, entry):
+        """Insert (or replace) an entry."""
+        self.entries[name] = entry
+        self.entries.move_to_end(name)
+
+    def drop(self, name):
+        """Remove an entry."""
+        self.get(name)
+        del self.entries[name]
+
+    def resize(self, name):
+        """Recalculate an entry's size and evict others over the budget."""
+        entry = self.entries[name]
+        entry.size = _estimate_size(entry.profile)
+
+        # Never evict the profile just touched
+        while self.total() > self.budget and len(self.entries) > 1:
+            oldest = next(iter(self.entries))
+
+            if oldest == name:
+                self.entries.move_to_end(name)
+                continue
+
+            del self.entries[oldest]
+
+    def total(self):
+        """Estimated bytes held by all resident profiles."""
+        return sum(entry.size for entry in self.entries.values())
+
+
+class Server():
+    """Handle JSON-lines requests against resident profiles.
+
+    Properties:
+        cache -- a ProfileCache
+        pool -- process pool for heavy rules
+    """
+
+    def __init__(self, budget, workers=None):
+        self.cache = ProfileCache(budget)
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+
+    async def handle(self, request):
+        """Handle one request and return its result."""
+        op = request.get('op')
+        loop = asyncio.get_running_loop()
+
+        if op == 'list':
+            return {name: {'ready': entry.ready.done(), 'size': entry.size}
+                    for name, entry in self.cache.entries.items()}
+
+        name = request['profile']
+
+        if op in ('load', 'upload'):
+            # Placeholder first, so later requests wait for this one
+            entry = Entry(loop)
+            self.cache.put(name, entry)
+
+            try:
+                if op == 'load':
+                    labels, profile = await asyncio.to_thread(
+                        self._load, request['path'], request.get('sep', '\t'))
+                else:
+                    labels, profile = None, await asyncio.to_thread(Profile, set(_pairs(request)))
+            except BaseException as error:
+                entry.ready.set_exception(error)
+                entry.ready.exception()  # retrieved, waiters get it too
+
+                if self.cache.entries.get(name) is entry:
+                    self.cache.drop(name)
+                raise
+
+            entry.profile, entry.labels = profile, labels
+            entry.ready.set_result(None)
+
+            if self.cache.entries.get(name) is entry:
+                self.cache.resize(name)
+
+            return {'mayors': len(profile.mayors), 'total_votes': profile.total_votes}
+
+        entry = self.cache.get(name)
+        await entry.ready
+
+        if op == 'drop':
+            self.cache.drop(name)
+            return None
+
+        if op == 'add':
+            # Runs on the loop thread, so no query sees a half updated profile
+            entry.profile.add(_pairs(request))
+            self.cache.resize(name)
+            return {'mayors': len(entry.profile.mayors), 'total_votes': entry.profile.total_votes}
+
+        if op == 'query':
+            rule, args = request['rule'], request.get('args')
+
+            if rule in HEAVY:
+                # Snapshot now, later adds must not leak into this query
+                blob = pickle.dumps(entry.profile)
+                result = await loop.run_in_executor(self.pool, _run_pickled, blob, rule, args)
+            else:
+                result = run_rule(entry.profile, rule, args)
+
+            return _relabel(result, entry.labels)
+
+        raise ValueError("unknown op {!r}".format(op))
+
+    @staticmethod
+    def _load(filepath, sep):
+        """Build a profile from a scores file, keeping the mayors labels."""
+        from socho.cli import load_scores
+
+        labels, data = load_scores(filepath, sep)
+        return labels, Profile.ballot_box(data)
+
+    async def respond(self, line, write):
+        """Parse a request line, handle it and write the response line."""
+        request_id = None
+
+        try:
+            request = json.loads(line)
+            request_id = request.get('id')
+            response = {'id': request_id, 'ok': True, 'result': await self.handle(request)}
+        except Exception as error:
+            response = {'id': request_id, 'ok': False,
+                        'error': "{}: {}".format(type(error).__name__, error)}
+
+        write(json.dumps(response, default=_to_json) + '\n')
+
+    async def serve_stream(self, reader, write):
+        """Serve requests from a stream until EOF."""
+        tasks = set()
+
+        while True:
+            line = await reader.readline()
+
+            if not line:
+                break
+
+            if not line.strip():
+                continue
+
+            task = asyncio.ensure_future(self.respond(line, write))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        # Answer what was already asked before leaving
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    async def serve_stdio(self):
+        """Serve requests from stdin, writing responses to stdout."""
+        loop = asyncio.get_running_loop()
+
+        # Pipes and TTYs are watched by the loop, regular files (socho
+        # serve < requests.jsonl) are read in a thread
+        if stat.S_ISREG(os.fstat(sys.stdin.fileno()).st_mode):
+            reader = FileReader(sys.stdin.buffer)
+        else:
+            reader = asyncio.StreamReader(limit=2 ** 30)
+            await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+
+        def write(text):
+            sys.stdout.write(text)
+            sys.stdout.flush()
+
+        await self.serve_stream(reader, write)
+
+    async def serve_socket(self, path=None, host='127.0.0.1', port=None):
+        """Serve requests from a unix socket (path) or a local TCP port."""
+        async def client(reader, writer):
+            await self.serve_stream(reader, writer.write)
+            await writer.drain()
+            writer.close()
+
+        if path is not None:
+            server = await asyncio.start_unix_server(client, path, limit=2 ** 30)
+        else:
+            server = await asyncio.start_server(client, host, port, limit=2 ** 30)
+
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.pool.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='socho serve')
+
+    parser.add_argument("--socket",
+                        dest="socket_path",
+                        default=None,
+                        help="Unix socket path to listen on.")
+
+    parser.add_argument("--port",
+                        dest="port",
+                        type=int,
+                        default=None,
+                        help="Local TCP port to listen on.")
+
+    parser.add_argument("--memory",
+                        dest="memory",
+                        type=float,
+                        default=1024,
+                        help="Memory budget for resident profiles, in MB.")
+
+    parser.add_argument("--workers",
+                        dest="workers",
+                        type=int,
+                        default=None,
+                        help="Worker processes for heavy rules.")
+
+    args = parser.parse_args(argv)
+    server = Server(int(args.memory * 2 ** 20), args.workers)
+
+    try:
+        if args.socket_path is None and args.port is None:
+            asyncio.run(server.serve_stdio())
+        else:
+            asyncio.run(server.serve_socket(args.socket_path, port=args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
@@ -0,0 +1,103 @@
+"""Maximum-likelihood strengths of the mayors, fitted with the
+minorize-maximize (MM) iterations of Hunter (2004), "MM algorithms for
+generalized Bradley-Terry models".
+
+Plackett-Luce fits the ballots: a ballot picks its mayors top to bottom,
+each time with probability proportional to the strengths of the mayors
+left. Bradley-Terry fits the pairwise matrix alone.
+"""
+import numpy
+
+
+def _start(n_mayors, init):
+    """Normalized starting strengths, uniform if init is None."""
+    if init is None:
+        return numpy.full(n_mayors, 1.0 / n_mayors)
+
+    gamma = numpy.asarray(init, dtype=float).copy()
+    gamma[~(gamma > 0)] = 1.0 / n_mayors  # unknown or non-positive
+
+    return gamma / gamma.sum()
+
+
+def plackett_luce(weights, positions, tol=1e-6, max_iter=1000, init=None):
+    """Return (strengths, iterations) of the Plackett-Luce model.
+
+    Keyword arguments:
+        weights -- votes per ballot
+        positions -- ballot position matrix (ballots X mayors)
+        tol -- stop when no strength changes more than tol (default 1e-6)
+        max_iter -- iteration cap (default 1000)
+        init -- starting strengths, i.e. a previous fit (default None)
+    """
+    n_ballots, n_mayors = positions.shape
+    gamma = _start(n_mayors, init)
+
+    if n_mayors < 2:
+        return gamma, 0
+
+    # order[u, p] -- mayor at position p of the u-th ballot
+    order = numpy.argsort(positions, axis=1)
+    weights = numpy.asarray(weights, dtype=float)
+
+    # Times each mayor is picked while others are left (not last)
+    wins = weights @ (positions < n_mayors - 1)
+
+    last = numpy.minimum(positions, n_mayors - 2)
+
+    for iteration in range(1, max_iter + 1):
+        # Strengths left from each position on
+        left = numpy.cumsum(gamma[order][:, ::-1], axis=1)[:, ::-1]
+
+        # A mayor at position p is in the choice sets 0..p
+        inverse = weights[:, None] / left[:, :-1]
+        sets = numpy.cumsum(inverse, axis=1)
+
+        denominator = numpy.take_along_axis(sets, last, axis=1).sum(axis=0)
+
+        new_gamma = wins / denominator
+        new_gamma /= new_gamma.sum()
+
+        change = numpy.abs(new_gamma - gamma).max()
+        gamma = new_gamma
+
+        if change < tol:
+            break
+
+    return gamma, iteration
+
+
+def bradley_terry(wins, tol=1e-6, max_iter=1000, init=None):
+    """Return (strengths, iterations) of the Bradley-Terry model.
+
+    Keyword arguments:
+        wins -- wins[i, j] is the number of votes preferring i over j
+        tol -- stop when no strength changes more than tol (default 1e-6)
+        max_iter -- iteration cap (default 1000)
+        init -- starting strengths, i.e. a previous fit (default None)
+    """
+    wins = numpy.asarray(wins, dtype=float)
+    n_mayors = len(wins)
+    gamma = _start(n_mayors, init)
+
+    if n_mayors < 2:
+        return gamma, 0
+
+    games = wins + wins.T
+    total_wins = wins.sum(axis=1)
+
+    for iteration in range(1, max_iter + 1):
+        pair_strength = gamma[:, None] + gamma[None, :]
+        ratio = numpy.divide(games, pair_strength, out=numpy.zeros_like(games),
+                             where=pair_strength > 0)
+
+        new_gamma = total_wins / ratio.sum(axis=1)
+        new_gamma /= new_gamma.sum()
+
+        change = numpy.abs(new_gamma - gamma).max()
+        gamma = new_gamma
+
+        if change < tol:
+            break
+
+    return gamma, iteration
@@ -0,0 +1,281 @@
+"""Mergeable sufficient statistics of a profile.
+
+Most rules only need the pairwise matrix and the votes per position, not
+the ballots. A ProfileSummary keeps just those and the total number of
+votes, so ingestion shards can build one each, ship it as a small binary
+blob and merge them by addition:
+
+    blobs = [ProfileSummary.from_pairs(shard).to_bytes() for shard in shards]
+    summary = sum(ProfileSummary.from_bytes(blob) for blob in blobs)
+    summary.ranking(summary.borda)
+"""
+import json
+import struct
+import numpy
+from itertools import permutations
+
+from socho.pairwise import position_matrix, position_counts, _net_tiles
+from socho.scoring import Scoring, by_score
+
+# Blob header: magic, version, #mayors, total votes, dtype char, labels length
+MAGIC = b'SOCHOSUM'
+HEADER = struct.Struct('<8sBQQcQ')
+VERSION = 1
+
+
+class ProfileSummary(Scoring):
+    """Pairwise matrix and position counts of a profile.
+
+    Properties:
+        mayors -- ordered list of mayors
+        wins -- wins[i, j] is the number of votes preferring mayors[i]
+            over mayors[j]
+        counts -- counts[p, c] is the number of votes with mayors[c] at
+            position p
+        total_votes -- total number of votes
+    """
+
+    def __init__(self, mayors, wins, counts, total_votes):
+        """Set the properties.
+
+        Keyword arguments:
+            mayors -- ordered list of mayors
+            wins -- pairwise matrix (m X m)
+            counts -- position counts (m X m)
+            total_votes -- total number of votes
+        """
+        self.mayors = list(mayors)
+        self.index = {mayor: i for i, mayor in enumerate(self.mayors)}
+
+        self.wins = numpy.asarray(wins, dtype=numpy.int64)
+        self.counts = numpy.asarray(counts, dtype=numpy.int64)
+        self.total_votes = int(total_votes)
+
+    @classmethod
+    def from_pairs(cls, pairs, mayors=None):
+        """Summarize (number of votes, ballot) pairs.
+
+        Keyword arguments:
+            pairs -- an iterable of (number of votes, ballot)
+            mayors -- ordered list of mayors (default sorted mayors)
+        """
+        pairs = list(pairs)
+
+        if mayors is None:
+            mayors = sorted(pairs[0][1])
+
+        weights, positions = position_matrix(pairs, mayors)
+        net = numpy.zeros((len(mayors), len(mayors)), dtype=numpy.int64)
+
+        for rows, cols, tile in _net_tiles(weights, positions, 1024):
+            net[rows, cols] = tile
+            net[cols, rows] = -tile.T
+
+        # Complete ballots: wins[i, j] + wins[j, i] = total votes
+        total_votes = int(weights.sum())
+        wins = (total_votes + net) // 2
+        numpy.fill_diagonal(wins, 0)
+
+        return cls(mayors, wins, position_counts(weights, positions), total_votes)
+
+    # Merging
+    def __add__(self, other):
+        """Return the summary of both profiles' ballots."""
+        if other == 0:  # so sum() works
+            return self
+
+        if set(self.mayors) != set(other.mayors):
+            raise ValueError("summaries have different mayors")
+
+        # Align other's rows/columns with ours
+        order = [other.index[mayor] for mayor in self.mayors]
+
+        wins = self.wins + other.wins[numpy.ix_(order, order)]
+        counts = self.counts + other.counts[:, order]
+
+        return ProfileSummary(self.mayors, wins, counts, self.total_votes + other.total_votes)
+
+    __radd__ = __add__
+
+    # Serialization
+    def to_bytes(self):
+        """Return the summary as a binary blob.
+
+        Mayors are stored as JSON, so they must be ints or strings.
+        """
+        labels = json.dumps(self.mayors).encode('utf-8')
+
+        # Counts are at most total_votes, so use the smallest dtype for it
+        dtype = numpy.dtype(numpy.min_scalar_type(self.total_votes)).newbyteorder('<')
+
+        header = HEADER.pack(MAGIC, VERSION, len(self.mayors), self.total_votes,
+                             dtype.char.encode('ascii'), len(labels))
+
+        return b''.join([header, labels,
+                         self.wins.astype(dtype).tobytes(),
+                         self.counts.astype(dtype).tobytes()])
+
+    @classmethod
+    def from_bytes(cls, blob):
+        """Return the summary stored in a blob from to_bytes."""
+        magic, version, n_mayors, total_votes, char, n_labels = HEADER.unpack_from(blob)
+
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a socho profile summary")
+
+        offset = HEADER.size
+        mayors = json.loads(blob[offset:offset + n_labels].decode('utf-8'))
+        offset += n_labels
+
+        dtype = numpy.dtype(char.decode('ascii')).newbyteorder('<')
+        size = n_mayors * n_mayors
+
+        matrices = numpy.frombuffer(blob, dtype=dtype, count=2 * size, offset=offset)
+        wins, counts = matrices.reshape(2, n_mayors, n_mayors)
+
+        return cls(mayors, wins, counts, total_votes)
+
+    # Mayor comparisons
+    def net_preference(self, mayor1, mayor2):
+        """Return the net preference of mayor1 over mayor2.
+
+        Keyword arguments:
+            mayor1 -- mayor to be compared
+            mayor2 -- other mayor to be compared
+        """
+        i, j = self.index[mayor1], self.index[mayor2]
+        return int(self.wins[i, j] - self.wins[j, i])
+
+    def _net_row(self, mayor):
+        """Net preferences of mayor over every mayor, aligned with mayors."""
+        i = self.index[mayor]
+        return self.wins[i] - self.wins[:, i]
+
+    # Simple scores
+    def copeland(self, mayor):
+        """Calculate the Copeland score for a mayor.
+
+        Keyword arguments:
+            mayor -- base mayor for scoring
+        """
+        return int(numpy.sign(self._net_row(mayor)).sum())
+
+    def symmetric_borda(self, mayor):
+        """Calculate the Symmetric Borda score for a mayor.
+
+        Keyword arguments:
+            mayor -- base mayor for scoring
+        """
+        return int(self._net_row(mayor).sum())
+
+    def borda(self, mayor):
+        """Calculate the Borda score for a mayor.
+
+        Keyword arguments:
+            mayor -- base mayor for scoring
+        """
+        top_score = len(self.mayors) - 1
+        points = top_score - numpy.arange(len(self.mayors))
+
+        return int(points @ self.counts[:, self.index[mayor]])
+
+    def dowdall(self, mayor):
+        """Calculate the Dowdall score for a mayor.
+
+        Keyword arguments:
+            mayor -- base mayor for scoring
+        """
+        top_score = len(self.mayors) - 1
+        positions = numpy.arange(len(self.mayors))
+        points = (top_score - positions) / (positions + 1)
+
+        return float(points @ self.counts[:, self.index[mayor]])
+
+    def simpson(self, mayor):
+        """Calculate the Simpson score for a mayor.
+
+        Keyword arguments:
+            mayor -- base mayor for scoring
+        """
+        net = numpy.delete(self._net_row(mayor), self.index[mayor])
+        return int(net.min())
+
+    def schulze(self, mayor):
+        """Return the total mayor's wins with Schulze method.
+
+        Keyword arguments:
+            mayor -- base mayor for voting count
+        """
+        strengths = self._path_strengths()
+        i = self.index[mayor]
+
+        wins = strengths[i] > strengths[:, i]
+        wins[i] = False
+
+        return int(wins.sum())
+
+    def _path_strengths(self):
+        """Strongest path (weakest link) between every two mayors, over
+        the net preferences, with Floyd-Warshall."""
+        if getattr(self, '_strengths', None) is None:
+            strengths = self.wins - self.wins.T
+
+            for k in range(len(self.mayors)):
+                strengths = numpy.maximum(strengths, numpy.minimum(strengths[:, k, None],
+                                                                   strengths[None, k, :]))
+
+            self._strengths = strengths
+
+        return self._strengths
+
+    def condorcet_winners(self):
+        """Calculate the Condorcet Winners and returns a set of winner mayors"""
+        net = self.wins - self.wins.T
+        return {self.mayors[i] for i in numpy.flatnonzero((net >= 0).all(axis=1))}
+
+    def _build_graph(self):
+        """Build graph for Kemeny-Young method: edge_weights[i, j] is the
+        majority margin of mayors[i] over mayors[j], when positive."""
+        return numpy.maximum(self.wins - self.wins.T, 0)
+
+    def kemeny_young(self):
+        """Kemeny-Young optimal rank aggregation from the pairwise matrix.
+
+        The Kendall tau distance of a rank to all ballots is the number of
+        votes preferring j over i, summed over i ranked before j.
+        """
+        min_dist = numpy.inf
+        best_rank = None
+
+        n_candidates = len(self.mayors)
+
+        for rank in permutations(range(n_candidates)):
+            rank = list(rank)
+
+            # votes disagreeing with each (earlier, later) pair of the rank
+            disagree = self.wins[numpy.ix_(rank, rank)].T
+            dist = numpy.triu(disagree, 1).sum()
+
+            if dist < min_dist:
+                min_dist = dist
+                best_rank = rank
+
+        scores_rank = list(range(n_candidates, 0, -1))
+        return list(zip([self.mayors[i] for i in best_rank], scores_rank))
+
+    def bradley_terry(self, tol=1e-6, max_iter=1000, init=None):
+        """Bradley-Terry maximum-likelihood aggregation from the pairwise
+        matrix. Returns a list of (mayor, strength) ordered by strength
+        decrescent.
+
+        Keyword arguments:
+            tol -- stop when no strength changes more than tol (default 1e-6)
+            max_iter -- iteration cap (default 1000)
+            init -- starting {mayor: strength} (default None)
+        """
+        from socho import strength
+
+        start = None if init is None else [init.get(mayor, 0) for mayor in self.mayors]
+        gamma, _ = strength.bradley_terry(self.wins, tol, max_iter, start)
+
+        return by_score(zip(self.mayors, gamma.tolist()))
@@ -0,0 +1,226 @@
+"""Truncated (top-k) ballots.
+
+A truncated ballot ranks only some of the mayors, i.e. the top-k
+predictions of a classifier. Ranked mayors are preferred over unranked
+ones, and unranked mayors are tied among themselves.
+
+TruncatedProfile stores the ballots sparsely, as (ballot id, position,
+mayor) triples, so memory and compute scale with the number of ranked
+entries instead of voters X mayors. For example:
+
+    profile = TruncatedProfile({(40,(0,1)),(28,(1,)),(32,(2,1))}, mayors=[0,1,2,3])
+    profile.ranking(profile.borda)
+"""
+import numpy
+
+from socho.scoring import Scoring
+
+
+class TruncatedProfile(Scoring):
+    """A set of (number of votes, truncated ballot) pairs.
+
+    Positional scores give a ranked mayor the points of his position and
+    split the points of the remaining positions evenly among the unranked
+    mayors. In pairwise comparisons a ranked mayor beats an unranked one,
+    and two unranked mayors tie.
+
+    Properties:
+        mayors -- ordered list of mayors
+        index -- mayor -> column
+        weights -- votes per ballot
+        lengths -- number of ranked mayors per ballot
+        ballot_ids, positions, columns -- ranked entries as triples
+        total_votes -- total number of votes
+    """
+
+    def __init__(self, pairs, mayors=None):
+        """Set the properties.
+
+        Keyword arguments:
+            pairs -- an iterable of (number of votes, truncated ballot)
+            mayors -- every mayor, including never ranked ones
+                (default sorted ranked mayors)
+        """
+        pairs = list(pairs)
+
+        if mayors is None:
+            mayors = sorted({mayor for _, ballot in pairs for mayor in ballot})
+
+        self.mayors = list(mayors)
+        self.index = {mayor: c for c, mayor in enumerate(self.mayors)}
+
+        self.weights = numpy.array([n_votes for n_votes, _ in pairs], dtype=numpy.int64)
+        self.lengths = numpy.array([len(ballot) for _, ballot in pairs], dtype=numpy.intp)
+
+        # Ranked entries, ballot by ballot
+        self.ballot_ids = numpy.repeat(numpy.arange(len(pairs)), self.lengths)
+        self.positions = numpy.concatenate([numpy.arange(k) for k in self.lengths] or [[]]).astype(numpy.intp)
+        self.columns = numpy.array([self.index[mayor] for _, ballot in pairs for mayor in ballot],
+                                   dtype=numpy.intp)
+
+        self.total_votes = int(self.weights.sum())
+
+        # Votes ranking each mayor
+        self.ranked_votes = numpy.bincount(self.columns, weights=self.weights[self.ballot_ids],
+                                           minlength=len(self.mayors)).astype(numpy.int64)
+
+        self.__calc_net_preference()
+        self._points = dict()
+
+    @classmethod
+    def ballot_box(cls, choices, mayors=None):
+        """Group truncated choices into a TruncatedProfile.
+
+        Keyword arguments:
+            choices -- a list of (mayor, score) lists, only the top ones,
+                i.e, [ [voter's 1 (mayor, score) top-k],
+                       [voter's 2 (mayor, score) top-k] ... ]
+            mayors -- every mayor, including never ranked ones
+                (default sorted ranked mayors)
+        """
+        ballots = dict()
+
+        for choice in choices:
+            # Order by score decrescent, keep only the mayors
+            key = tuple(mayor for mayor, _ in sorted(choice, key=lambda y: y[1], reverse=True))
+            ballots[key] = ballots.get(key, 0) + 1
+
+        return cls([(n_votes, ballot) for ballot, n_votes in ballots.items()], mayors)
+
+    def __calc_net_preference(self):
+        """Sparse part of the net preferences.
+
+        For mayors i and j, net[i, j] = ranked_votes[i] - ranked_votes[j]
+        plus the votes ranking both with i above j, minus those with j
+        above i. Only co-ranked pairs are stored, in CSR arrays.
+        """
+        n_mayors = len(self.mayors)
+        rows, cols, data = list(), list(), list()
+
+        # Entries of ballots with the same length at once
+        starts = numpy.concatenate([[0], numpy.cumsum(self.lengths)[:-1]]).astype(numpy.intp)
+
+        for k in numpy.unique(self.lengths):
+            if k < 2:
+                continue
+
+            ballots = numpy.flatnonzero(self.lengths == k)
+            ranked = self.columns[starts[ballots, None] + numpy.arange(k)]  # (ballots X k)
+
+            above, below = numpy.triu_indices(k, 1)
+            weights = numpy.repeat(self.weights[ballots], len(above))
+
+            rows += [ranked[:, above].ravel(), ranked[:, below].ravel()]
+            cols += [ranked[:, below].ravel(), ranked[:, above].ravel()]
+            data += [weights, -weights]
+
+        if rows:
+            keys = numpy.concatenate(rows) * n_mayors + numpy.concatenate(cols)
+            keys, inverse = numpy.unique(keys, return_inverse=True)
+
+            values = numpy.zeros(len(keys), dtype=numpy.int64)
+            numpy.add.at(values, inverse, numpy.concatenate(data))
+        else:
+            keys = values = numpy.zeros(0, dtype=numpy.int64)
+
+        # keys are sorted, so they are in CSR order already
+        self._net_indptr = numpy.searchsorted(keys // n_mayors, numpy.arange(n_mayors + 1))
+        self._net_indices = keys % n_mayors
+        self._net_data = values
+
+    def _net_row(self, mayor):
+        """Net preferences of mayor over every mayor, aligned with mayors."""
+        i = self.index[mayor]
+        row = self.ranked_votes[i] - self.ranked_votes
+
+        start, stop = self._net_indptr[i], self._net_indptr[i + 1]
+        row[self._net_indices[start:stop]] += self._net_data[start:stop]
+
+        return row
+
+    def net_preference(self, mayor1, mayor2):
+        """Return the net preference of mayor1 over mayor2.
+
+        Keyword arguments:
+            mayor1 -- mayor to be compared
+            mayor2 -- other mayor to be compared
+        """
+        return int(self._net_row(mayor1)[self.index[mayor2]])
+
+    def _positional(self, name, points):
+        """Positional scores of every mayor, aligned with mayors.
+
+        Keyword arguments:
+            name -- cache key
+            points -- points per position, for m positions
+        """
+        if name not in self._points:
+            # Unranked mayors split the points left in each ballot
+            left = numpy.concatenate([[0], numpy.cumsum(points[::-1])])[::-1]
+            unranked = len(self.mayors) - self.lengths
+            share = numpy.divide(left[self.lengths], unranked,
+                                 out=numpy.zeros(len(self.lengths)), where=unranked > 0)
+
+            votes = self.weights[self.ballot_ids]
+
+            # Everybody gets the shares, ranked mayors swap it for their points
+            scores = numpy.full(len(self.mayors), float(self.weights @ share))
+            numpy.add.at(scores, self.columns,
+                         votes * (points[self.positions] - share[self.ballot_ids]))
+
+            self._points[name] = scores
+
+        return self._points[name]
+
+    # Simple scores
+    def borda(self, mayor):
+        """Calculate the Borda score for a mayor.
+
+        Keyword arguments:
+            mayor -- base mayor for scoring
+        """
+        top_score = len(self.mayors) - 1
+        points = top_score - numpy.arange(len(self.mayors), dtype=float)
+
+        return float(self._positional('borda', points)[self.index[mayor]])
+
+    def dowdall(self, mayor):
+        """Calculate the Dowdall score for a mayor.
+
+        Keyword arguments:
+            mayor -- base mayor for scoring
+        """
+        top_score = len(self.mayors) - 1
+        positions = numpy.arange(len(self.mayors), dtype=float)
+        points = (top_score - positions) / (positions + 1)
+
+        return float(self._positional('dowdall', points)[self.index[mayor]])
+
+    def copeland(self, mayor):
+        """Calculate the Copeland score for a mayor.
+
+        Keyword arguments:
+            mayor -- base mayor for scoring
+        """
+        return int(numpy.sign(self._net_row(mayor)).sum())
+
+    def symmetric_borda(self, mayor):
+        """Calculate the Symmetric Borda score for a mayor.
+
+        Keyword arguments:
+            mayor -- base mayor for scoring
+        """
+        return int(self._net_row(mayor).sum())
+
+    def simpson(self, mayor):
+        """Calculate the Simpson score for a mayor.
+
+        Keyword arguments:
+            mayor -- base mayor for scoring
+        """
+        net = numpy.delete(self._net_row(mayor), self.index[mayor])
+        return int(net.min())
+
+    def condorcet_winners(self):
+        """Calculate the Condorcet Winners and returns a set of winner mayors"""
+        return {mayor for mayor in self.mayors if (self._net_row(mayor) >= 0).all()}
@@ -0,0 +1,117 @@
+"""Margins of victory against a brute-force search on small profiles."""
+import math
+import random
+from itertools import combinations, permutations, product
+
+from socho.profile import Profile
+
+
+def random_profile(rng, n_mayors, max_voters):
+    pairs = dict()
+
+    for _ in range(rng.randint(1, max_voters)):
+        ballot = tuple(rng.sample(range(n_mayors), n_mayors))
+        pairs[ballot] = pairs.get(ballot, 0) + 1
+
+    return {(n_votes, ballot) for ballot, n_votes in pairs.items()}
+
+
+def winners(ballots, rule):
+    """Winners of complete ballots, scored from scratch."""
+    mayors = sorted(ballots[0])
+    top_score = len(mayors) - 1
+
+    points = {
+        'borda': lambda i: top_score - i,
+        'dowdall': lambda i: (top_score - i) / (i + 1),
+        'plurality': lambda i: int(i == 0),
+    }
+
+    if rule == 'copeland':
+        def net(mayor1, mayor2):
+            return sum(1 if ballot.index(mayor1) < ballot.index(mayor2) else -1 for ballot in ballots)
+
+        scores = {mayor1: sum((net(mayor1, mayor2) > 0) - (net(mayor1, mayor2) < 0)
+                              for mayor2 in mayors if mayor2 != mayor1)
+                  for mayor1 in mayors}
+    else:
+        scores = {mayor: sum(points[rule](ballot.index(mayor)) for ballot in ballots)
+                  for mayor in mayors}
+
+    best = max(scores.values())
+    return {mayor for mayor, score in scores.items() if score == best}
+
+
+def brute_force_margin(pairs, rule, winner):
+    """Fewest voters whose ballots, rewritten in any way, make winner lose."""
+    voters = [ballot for n_votes, ballot in pairs for _ in range(n_votes)]
+    orders = list(permutations(voters[0]))
+
+    for n_changed in range(1, len(voters) + 1):
+        for changed in combinations(range(len(voters)), n_changed):
+            for new_ballots in product(orders, repeat=n_changed):
+                ballots = list(voters)
+
+                for u, new_ballot in zip(changed, new_ballots):
+                    ballots[u] = new_ballot
+
+                if winner not in winners(ballots, rule):
+                    return n_changed
+
+    return math.inf
+
+
+def apply_witness(pairs, witness):
+    counts = {ballot: n_votes for n_votes, ballot in pairs}
+
+    for n_voters, ballot, new_ballot in witness:
+        counts[ballot] -= n_voters
+        counts[new_ballot] = counts.get(new_ballot, 0) + n_voters
+
+    return {(n_votes, ballot) for ballot, n_votes in counts.items() if n_votes > 0}
+
+
+def test_positional_margins_are_exact():
+    rng = random.Random(0)
+
+    for _ in range(30):
+        pairs = random_profile(rng, 3, 4)
+        profile = Profile(pairs)
+
+        for rule in ('borda', 'dowdall', 'plurality'):
+            margins = profile.margin_of_victory(getattr(profile, rule))
+
+            for winner, (margin, _) in margins.items():
+                assert margin == brute_force_margin(pairs, rule, winner), (pairs, rule, winner)
+
+
+def test_witnesses_flip_the_winner():
+    rng = random.Random(1)
+
+    for _ in range(30):
+        pairs = random_profile(rng, rng.randint(3, 5), 8)
+        profile = Profile(pairs)
+
+        for rule in ('borda', 'dowdall', 'plurality', 'copeland'):
+            margins = profile.margin_of_victory(getattr(profile, rule))
+
+            for winner, (margin, witness) in margins.items():
+                if margin == math.inf:
+                    continue
+
+                assert margin == sum(n_voters for n_voters, _, _ in witness)
+
+                ballots = [ballot for n_votes, ballot in apply_witness(pairs, witness)
+                           for _ in range(n_votes)]
+                assert winner not in winners(ballots, rule), (pairs, rule, winner)
+
+
+def test_copeland_margin_is_an_upper_bound():
+    rng = random.Random(2)
+
+    for _ in range(20):
+        pairs = random_profile(rng, 3, 4)
+        profile = Profile(pairs)
+
+        for winner, (margin, _) in profile.margin_of_victory(profile.copeland).items():
+            assert margin >= brute_force_margin(pairs, 'copeland', winner)
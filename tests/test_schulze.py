@@ -0,0 +1,54 @@
+"""Schulze scores against widest paths found by brute force."""
+import random
+from itertools import permutations
+
+from socho.profile import Profile
+from socho.summary import ProfileSummary
+
+
+def random_profile(rng, n_mayors, max_pairs):
+    return {(rng.randint(1, 9), tuple(rng.sample(range(n_mayors), n_mayors)))
+            for _ in range(rng.randint(1, max_pairs))}
+
+
+def brute_force_schulze(profile):
+    """Schulze wins per mayor, over every simple path of net preferences."""
+    mayors = sorted(profile.mayors)
+
+    def strength(mayor1, mayor2):
+        others = [mayor for mayor in mayors if mayor not in (mayor1, mayor2)]
+        best = None
+
+        for length in range(len(others) + 1):
+            for middle in permutations(others, length):
+                path = (mayor1,) + middle + (mayor2,)
+                weakest = min(profile.net_preference(a, b) for a, b in zip(path, path[1:]))
+
+                if best is None or weakest > best:
+                    best = weakest
+
+        return best
+
+    return [(mayor1, sum(strength(mayor1, mayor2) > strength(mayor2, mayor1)
+                         for mayor2 in mayors if mayor2 != mayor1))
+            for mayor1 in mayors]
+
+
+def test_schulze_matches_brute_force():
+    rng = random.Random(0)
+
+    for _ in range(40):
+        pairs = random_profile(rng, rng.randint(2, 6), 6)
+        profile = Profile(pairs)
+        summary = ProfileSummary.from_pairs(pairs)
+
+        expected = brute_force_schulze(profile)
+
+        assert profile.score(profile.schulze) == expected, pairs
+        assert summary.score(summary.schulze) == expected, pairs
+
+
+def test_schulze_paths_do_not_leak_between_branches():
+    profile = Profile({(7, (2, 0, 4, 3, 1)), (3, (0, 4, 1, 2, 3))})
+
+    assert profile.score(profile.schulze) == [(0, 3), (1, 0), (2, 4), (3, 1), (4, 2)]